@@ -1,66 +1,269 @@
-from flask import Flask, jsonify, request, session, redirect, url_for, render_template
+from flask import Flask, Response, g, jsonify, request, session, redirect, url_for, render_template
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
 from flask_cors import CORS
-import yfinance as yf
-import pandas as pd
+from werkzeug.datastructures import CallbackDict
 from datetime import datetime, timedelta
 import json
 import os
 import random
+import re
+import secrets
 import string
+import sys
+import time
+
+# Only modules without NumPy/pandas are imported here. The data stack
+# (columnar, compiler, data_store, execution, result_cache) is imported by
+# the market data and backtest routes on first use, or by warm_up_engine()
+from trading_engine.cache import SingleFlight, TTLCache
+from trading_engine.instrumentation import REGISTRY, SamplingProfiler, stage
+from trading_engine.jobs import BacktestQueue, QueueFullError
+from trading_engine.ledger import Ledger
+from trading_engine.price_stream import PriceStream, SyntheticTickSource, YFinanceTickSource, format_sse
+from trading_engine.state_store import StateStore
 
 app = Flask(__name__)
-CORS(app)
+# Let browser clients read the metadata headers of paged and binary responses
+CORS(app, expose_headers=['X-Next-Cursor', 'X-Rows', 'X-Columns', 'X-Symbol', 'X-Interval', 'X-Profile'])
 
 # Basic configuration
 app.config['SECRET_KEY'] = 'your-secret-key-here'  # Change this in production
 app.secret_key = 'your-secret-key-here'  # Change this in production
 
-# In-memory storage for portfolio, trades, and strategies
-portfolio = {
-    'total_value': 100000,
-    'daily_change': 1500,
-    'daily_change_percent': 1.5,
-    'positions': [
-        {
-            'symbol': 'AAPL',
-            'quantity': 100,
-            'current_price': 150.25,
-            'total_value': 15025,
-            'daily_change': 125
-        },
-        {
-            'symbol': 'MSFT',
-            'quantity': 50,
-            'current_price': 250.75,
-            'total_value': 12537.5,
-            'daily_change': 87.5
-        }
-    ]
-}
-
-trades = [
-    {
-        'id': '1',
-        'symbol': 'AAPL',
-        'type': 'buy',
-        'quantity': 10,
-        'price': 149.50,
-        'timestamp': '2024-03-20T10:30:00Z'
-    },
-    {
-        'id': '2',
-        'symbol': 'MSFT',
-        'type': 'sell',
-        'quantity': 5,
-        'price': 251.25,
-        'timestamp': '2024-03-20T11:15:00Z'
+# Per-process resources, created on first use or by create_app(). Users,
+# saved strategies, sessions and job records live in the state store and
+# portfolio state in the ledger, each in its own SQLite database shared by
+# every worker process.
+_ledger = None
+_state_store = None
+_backtest_queue = None
+_price_stream = None
+
+# Every distinct symbol streamed has its own upstream poller thread
+STREAM_MAX_SYMBOLS = int(os.environ.get('STREAM_MAX_SYMBOLS', 20))
+
+def get_ledger():
+    """Return this process's handle on the SQLite-backed portfolio ledger"""
+    global _ledger
+    if _ledger is None:
+        _ledger = Ledger()
+    return _ledger
+
+def get_state_store():
+    """Return this process's handle on the shared users, strategies, sessions and jobs store"""
+    global _state_store
+    if _state_store is None:
+        _state_store = StateStore()
+    return _state_store
+
+def get_backtest_queue():
+    """Return this process's backtest job queue"""
+    global _backtest_queue
+    if _backtest_queue is None:
+        _backtest_queue = BacktestQueue(
+            max_pending=int(os.environ.get('BACKTEST_MAX_PENDING', 32)), store=get_state_store()
+        )
+    return _backtest_queue
+
+def get_price_stream():
+    """Return this process's price stream; live prices are polled once per symbol"""
+    global _price_stream
+    if _price_stream is None:
+        _price_stream = PriceStream(
+            SyntheticTickSource() if os.environ.get('PRICE_STREAM_SOURCE') == 'synthetic' else YFinanceTickSource(),
+            interval=float(os.environ.get('PRICE_STREAM_INTERVAL', 5))
+        )
+    return _price_stream
+
+class StoreSession(CallbackDict, SessionMixin):
+    """Session data kept server-side; the cookie only holds a random id"""
+    
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+class StoreSessionInterface(SessionInterface):
+    """Keep sessions in the state store so every worker process sees the same ones"""
+    
+    serializer = TaggedJSONSerializer()
+    
+    def open_session(self, app, request):
+        # SESSION_COOKIE_NAME is read directly: get_cookie_name() is newer
+        # than the pinned Flask 2.0
+        sid = request.cookies.get(app.config['SESSION_COOKIE_NAME'])
+        if sid:
+            data = get_state_store().get_session(sid)
+            if data is not None:
+                return StoreSession(self.serializer.loads(data), sid=sid)
+        return StoreSession(sid=secrets.token_urlsafe(32), new=True)
+    
+    def save_session(self, app, session, response):
+        name = app.config['SESSION_COOKIE_NAME']
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+        if not session:
+            if session.modified and not session.new:
+                get_state_store().delete_session(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not self.should_set_cookie(app, session):
+            return
+        get_state_store().save_session(
+            session.sid, self.serializer.dumps(dict(session)),
+            time.time() + app.permanent_session_lifetime.total_seconds()
+        )
+        response.set_cookie(
+            name, session.sid, expires=self.get_expiration_time(app, session), domain=domain, path=path,
+            httponly=self.get_cookie_httponly(app), secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+app.session_interface = StoreSessionInterface()
+
+# Serialized price history responses, keyed by symbol, range, interval and format
+price_history_cache = TTLCache(maxsize=256, ttl=60)
+price_history_flight = SingleFlight()
+
+# Request metrics are always recorded; the sampling profiler only runs for
+# requests made with ?profile=1 while PROFILING_ENABLED=1
+app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED') == '1'
+PROFILE_DIR = os.environ.get(
+    'PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'profiles')
+)
+REQUEST_SECONDS = REGISTRY.histogram('http_request_duration_seconds', 'Request latency by route')
+REQUESTS_IN_FLIGHT = REGISTRY.gauge('http_requests_in_flight', 'Requests being handled by route')
+
+def _route():
+    # The URL rule keeps label values bounded, e.g. /api/stock/<symbol>
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc(route=_route())
+    if app.config['PROFILING_ENABLED'] and request.args.get('profile') == '1':
+        g.profiler = SamplingProfiler().start()
+
+@app.after_request
+def finish_request(response):
+    g.status = response.status_code
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+        route = re.sub(r'[^A-Za-z0-9]+', '_', _route()).strip('_') or 'root'
+        name = '{}-{}-{}.folded'.format(int(time.time() * 1000), request.method, route)
+        profiler.dump(os.path.join(PROFILE_DIR, name))
+        response.headers['X-Profile'] = name
+    return response
+
+@app.teardown_request
+def record_request(error=None):
+    started = g.pop('request_started', None)
+    if started is None:
+        return
+    route = _route()
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - started, route=route, method=request.method, status=g.get('status', 500)
+    )
+    REQUESTS_IN_FLIGHT.dec(route=route)
+
+def collect_component_metrics():
+    """Cache, queue and stream stats, read when /metrics is scraped"""
+    backtest_queue = get_backtest_queue()
+    caches = {
+        'price_history': price_history_cache.stats(),
+        'backtest_jobs': backtest_queue.results.stats()
     }
-]
+    # A scrape shouldn't load the data stack, so these are only reported
+    # once a request has imported them
+    if 'trading_engine.data_store' in sys.modules:
+        caches['bar_store'] = sys.modules['trading_engine.data_store'].get_bar_store().stats()
+    if 'trading_engine.result_cache' in sys.modules:
+        caches['backtest_results'] = sys.modules['trading_engine.result_cache'].get_result_cache().stats()
+    queue = backtest_queue.stats()
+    stream = get_price_stream().stats()
+    return [
+        ('cache_hits_total', 'counter', 'Cache hits',
+         [({'cache': name}, s['hits']) for name, s in caches.items()]),
+        ('cache_misses_total', 'counter', 'Cache misses',
+         [({'cache': name}, s['misses']) for name, s in caches.items()]),
+        ('cache_hit_ratio', 'gauge', 'Cache hits / lookups',
+         [({'cache': name}, s['hit_ratio']) for name, s in caches.items()]),
+        ('backtest_jobs_in_flight', 'gauge', 'Backtest jobs queued or running', [({}, queue['pending'])]),
+        ('price_stream_subscribers', 'gauge', 'Connected stream clients', [({}, stream['subscribers'])]),
+        ('price_stream_pollers', 'gauge', 'Symbols being polled', [({}, stream['pollers'])])
+    ]
 
-strategies = []
+REGISTRY.register_collector(collect_component_metrics)
 
-# In-memory user storage (replace with a database in production)
-users = {}
+# Bar intervals the market data provider understands
+HISTORY_INTERVALS = ('1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h', '1d', '5d', '1wk', '1mo', '3mo')
+
+def price_history_response(symbol, volume_key):
+    """Return a cached price history response for a symbol.
+    
+    The range is start/end (ISO date or epoch seconds) or the last `days`
+    days (default 30) at `interval` (default 1d). ?format= or the Accept
+    header selects the original JSON lists or a columnar format (columnar
+    JSON, raw binary or Arrow) with epoch-millisecond timestamps and the
+    columns named in `fields`.
+    """
+    from trading_engine.columnar import negotiate, parse_fields, parse_time
+    
+    args = request.args
+    fmt = negotiate(request.accept_mimetypes, args.get('format'))
+    interval = args.get('interval', '1d')
+    if interval not in HISTORY_INTERVALS:
+        raise ValueError('Unsupported interval: {}'.format(interval))
+    start = parse_time(args['start']) if args.get('start') else None
+    end = parse_time(args['end']) if args.get('end') else None
+    days = None if start is not None else int(args.get('days', 30))
+    fields = tuple(parse_fields(args.get('fields'))) if fmt != 'json' else None
+    
+    key = (symbol.upper(), start, end, days, interval, volume_key, fmt, fields)
+    entry = price_history_cache.get(key)
+    if entry is None:
+        # Concurrent requests for the same key share a single fetch
+        entry = price_history_flight.do(
+            key, lambda: _load_price_history(key, symbol, volume_key, start, end, days, interval, fmt, fields)
+        )
+    body, mimetype, headers = entry
+    response = app.response_class(body, mimetype=mimetype)
+    response.headers.update(headers)
+    response.headers['Vary'] = 'Accept'
+    return response
+
+def _load_price_history(key, symbol, volume_key, start, end, days, interval, fmt, fields):
+    from trading_engine.columnar import encode
+    from trading_engine.data_store import get_bar_store
+    
+    end_date = end if end is not None else datetime.now()
+    start_date = start if start is not None else end_date - timedelta(days=days)
+    with stage('price_history.load'):
+        hist = get_bar_store().history(symbol, start_date, end_date, interval=interval)
+    
+    if fmt == 'json':
+        # Convert to JSON-friendly format
+        with stage('price_history.convert'):
+            data = {
+                'dates': hist.index.strftime('%Y-%m-%d').tolist(),
+                'prices': hist['Close'].tolist(),
+                volume_key: hist['Volume'].tolist()
+            }
+        with stage('price_history.serialize'):
+            entry = (json.dumps(data), 'application/json', {})
+    else:
+        with stage('price_history.encode'):
+            entry = encode(hist, fmt, fields, {'symbol': symbol.upper(), 'interval': interval})
+    price_history_cache.set(key, entry)
+    return entry
 
 # Function to generate a random special phrase
 def generate_special_phrase():
@@ -161,12 +364,10 @@ def register():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        if username in users:
-            return jsonify({'error': 'User already exists!'}), 400
-        
         # Generate a special phrase for the user
         special_phrase = generate_special_phrase()
-        users[username] = {'password': password, 'special_phrase': special_phrase}
+        if not get_state_store().create_user(username, password, special_phrase):
+            return jsonify({'error': 'User already exists!'}), 400
         
         # Inform the user to save their special phrase
         return '''
@@ -193,8 +394,9 @@ def login():
         special_phrase = request.form['special_phrase']
         
         # Validate username, password, and special phrase
-        if username in users and users[username]['password'] == password:
-            if users[username]['special_phrase'] == special_phrase:
+        user = get_state_store().get_user(username)
+        if user is not None and user['password'] == password:
+            if user['special_phrase'] == special_phrase:
                 session['username'] = username
                 # Redirect to the frontend dashboard after successful login
                 return redirect('http://127.0.0.1:3000/')  # Replace with your frontend URL
@@ -208,7 +410,8 @@ def special_feature():
         return redirect(url_for('login'))
     if request.method == 'POST':
         phrase = request.form['phrase']
-        if phrase == users[session['username']]['special_phrase']:
+        user = get_state_store().get_user(session['username'])
+        if user is not None and phrase == user['special_phrase']:
             return jsonify({'message': 'Access granted to the special feature!'}), 200
         return jsonify({'error': 'Incorrect phrase!'}), 403
     return render_template('special_feature.html')
@@ -220,22 +423,12 @@ def logout():
 
 @app.route('/api/market-data/<symbol>', methods=['GET'])
 def get_market_data(symbol):
+    from trading_engine.columnar import UnsupportedFormatError
+    
     try:
-        # Get data for the last 30 days
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=30)
-        
-        stock = yf.Ticker(symbol)
-        hist = stock.history(start=start_date, end=end_date)
-        
-        # Convert to JSON-friendly format
-        data = {
-            'dates': hist.index.strftime('%Y-%m-%d').tolist(),
-            'prices': hist['Close'].tolist(),
-            'volumes': hist['Volume'].tolist()
-        }
-        
-        return jsonify(data)
+        return price_history_response(symbol, volume_key='volumes')
+    except UnsupportedFormatError as e:
+        return jsonify({'error': str(e)}), 406
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -247,20 +440,51 @@ def backtest_strategy():
         symbol = data.get('symbol')
         start_date = data.get('start_date')
         end_date = data.get('end_date')
+        params = data.get('params') or (strategy if isinstance(strategy, dict) else {})
         
-        # TODO: Implement backtesting logic
-        # This is a placeholder response
-        return jsonify({
-            'status': 'success',
-            'message': 'Backtesting will be implemented here',
-            'strategy': strategy,
-            'symbol': symbol,
-            'start_date': start_date,
-            'end_date': end_date
-        })
+        if not symbol or not start_date or not end_date:
+            return jsonify({'error': 'symbol, start_date and end_date are required'}), 400
+        
+        # A saved Strategy Builder strategy replaces the built-in RSI/MA rule
+        definition = None
+        strategy_id = data.get('strategy_id')
+        if strategy_id is not None:
+            definition = get_state_store().get_strategy(strategy_id)
+            if definition is None:
+                return jsonify({'error': 'Strategy not found'}), 404
+            # Fail fast on graphs that cannot be compiled
+            from trading_engine.compiler import get_compiled_strategy
+            get_compiled_strategy(definition)
+        
+        # Optional order execution model (fills, sizing, costs)
+        execution = data.get('execution')
+        if execution is not None:
+            from trading_engine.execution import ExecutionSimulator
+            ExecutionSimulator.from_config(execution)
+        
+        # Backtests run in the worker pool; clients poll the returned job id
+        job = get_backtest_queue().submit(
+            symbol, start_date, end_date, params, strategy=strategy, definition=definition,
+            execution=execution
+        )
+        return jsonify(job), 202
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/backtest/cache', methods=['GET'])
+def get_backtest_cache_stats():
+    from trading_engine.result_cache import get_result_cache
+    return jsonify(get_result_cache().stats())
+
+@app.route('/api/backtest/<job_id>', methods=['GET'])
+def get_backtest(job_id):
+    job = get_backtest_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Backtest job not found'}), 404
+    return jsonify(job)
+
 @app.route('/api/indicators', methods=['GET'])
 def get_available_indicators():
     # List of available technical indicators
@@ -276,58 +500,113 @@ def get_available_indicators():
 
 @app.route('/api/stock/<symbol>', methods=['GET'])
 def get_stock_data(symbol):
+    from trading_engine.columnar import UnsupportedFormatError
+    
     try:
-        # Get stock data for the last 30 days
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=30)
-        
-        stock = yf.Ticker(symbol)
-        hist = stock.history(start=start_date, end=end_date)
-        
-        return jsonify({
-            'dates': hist.index.strftime('%Y-%m-%d').tolist(),
-            'prices': hist['Close'].tolist(),
-            'volume': hist['Volume'].tolist()
-        })
+        return price_history_response(symbol, volume_key='volume')
+    except UnsupportedFormatError as e:
+        return jsonify({'error': str(e)}), 406
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/data-cache/stats', methods=['GET'])
+def get_data_cache_stats():
+    from trading_engine.data_store import get_bar_store
+    stats = get_bar_store().stats()
+    stats['responses'] = price_history_cache.stats()
+    return jsonify(stats)
+
+@app.route('/api/stream', methods=['GET'])
+def stream_prices():
+    symbols = list(dict.fromkeys(s for s in request.args.get('symbols', '').upper().split(',') if s))
+    if len(symbols) > STREAM_MAX_SYMBOLS:
+        return jsonify({'error': 'At most {} symbols can be streamed at once'.format(STREAM_MAX_SYMBOLS)}), 400
+    price_stream = get_price_stream()
+    
+    def events():
+        # Subscribe only once the response is sent, so a response that is
+        # never iterated (and never closed) leaves no pollers running
+        subscriber = price_stream.subscribe(symbols)
+        try:
+            # Full state once, then only incremental ticks and position changes
+            yield format_sse('snapshot', {
+                'prices': price_stream.snapshot(symbols),
+                'portfolio': get_ledger().portfolio()
+            })
+            while True:
+                event = subscriber.get(timeout=15)
+                if event is None:
+                    yield ': keepalive\n\n'
+                else:
+                    yield format_sse(event['type'], event)
+        finally:
+            price_stream.unsubscribe(subscriber)
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/portfolio', methods=['GET'])
 def get_portfolio():
-    return jsonify(portfolio)
+    return jsonify(get_ledger().portfolio())
 
 @app.route('/api/trades', methods=['GET'])
 def get_trades():
-    return jsonify(trades)
+    try:
+        limit = max(1, min(int(request.args.get('limit', 100)), 1000))
+        trades, next_cursor = get_ledger().list_trades(
+            symbol=request.args.get('symbol'),
+            side=request.args.get('side'),
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            cursor=request.args.get('cursor'),
+            limit=limit
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # The body stays a plain list; the next page is advertised in a header
+    response = jsonify(trades)
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @app.route('/api/trades', methods=['POST'])
 def add_trade():
     try:
-        trade = request.json
-        trade['id'] = str(len(trades) + 1)
-        trade['timestamp'] = datetime.now().isoformat()
-        trades.append(trade)
-        
-        # Update portfolio
-        update_portfolio(trade)
+        ledger = get_ledger()
+        trade = ledger.add_trade(request.json)
         
+        # Push the changed position to live dashboards
+        portfolio = ledger.portfolio()
+        get_price_stream().publish({
+            'type': 'position',
+            'symbol': trade['symbol'],
+            'position': ledger.get_position(trade['symbol']),
+            'total_value': portfolio['total_value']
+        })
         return jsonify(trade), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
 @app.route('/api/strategies', methods=['GET'])
 def get_strategies():
-    return jsonify(strategies)
+    return jsonify(get_state_store().list_strategies())
 
 @app.route('/api/strategies', methods=['POST'])
 def save_strategy():
     try:
         strategy = request.json
-        strategy['id'] = str(len(strategies) + 1)
         strategy['created'] = datetime.now().isoformat()
         strategy['lastModified'] = datetime.now().isoformat()
-        strategies.append(strategy)
-        return jsonify(strategy), 201
+        return jsonify(get_state_store().add_strategy(strategy)), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -342,42 +621,41 @@ def add_funds():
     if not amount or float(amount) <= 0:
         return jsonify({'error': 'Invalid amount'}), 400
 
-    # Add the funds to the user's account (in-memory example)
-    username = session['username']
-    if 'balance' not in users[username]:
-        users[username]['balance'] = 0
-    users[username]['balance'] += float(amount)
+    # Add the funds to the user's account
+    try:
+        balance = get_state_store().add_balance(session['username'], float(amount))
+    except KeyError:
+        return jsonify({'error': 'Unauthorized access'}), 401
+
+    return jsonify({'success': True, 'balance': balance}), 200
 
-    return jsonify({'success': True, 'balance': users[username]['balance']}), 200
+def warm_up_engine():
+    """Import the data and backtest stack and open its stores ahead of the first request that needs them"""
+    with stage('startup.warm_up'):
+        from trading_engine import columnar, compiler, execution, strategy
+        from trading_engine.data_store import get_bar_store
+        from trading_engine.result_cache import get_result_cache
+        get_bar_store()
+        get_result_cache()
 
-def update_portfolio(trade):
-    # Find the position in the portfolio
-    position = next((p for p in portfolio['positions'] if p['symbol'] == trade['symbol']), None)
-    
-    if position:
-        if trade['type'] == 'buy':
-            position['quantity'] += trade['quantity']
-            position['total_value'] = position['quantity'] * position['current_price']
-        else:  # sell
-            position['quantity'] -= trade['quantity']
-            position['total_value'] = position['quantity'] * position['current_price']
-            
-        # Remove position if quantity is 0
-        if position['quantity'] == 0:
-            portfolio['positions'].remove(position)
-    else:
-        if trade['type'] == 'buy':
-            new_position = {
-                'symbol': trade['symbol'],
-                'quantity': trade['quantity'],
-                'current_price': trade['price'],
-                'total_value': trade['quantity'] * trade['price'],
-                'daily_change': 0
-            }
-            portfolio['positions'].append(new_position)
+def create_app(warm_up=None):
+    """Return the app with this process's stores, job queue and price stream created.
     
-    # Update total portfolio value
-    portfolio['total_value'] = sum(p['total_value'] for p in portfolio['positions'])
+    Multi-worker WSGI servers should call this once per worker, after the
+    fork (e.g. `gunicorn -w 4 wsgi:app` without --preload), so each worker
+    opens its own SQLite connection and process pool. With warm_up (default:
+    the WARM_UP=1 environment variable) the data stack is imported up front
+    instead of by the first market data or backtest request.
+    """
+    get_ledger()
+    get_state_store()
+    get_backtest_queue()
+    get_price_stream()
+    if warm_up is None:
+        warm_up = os.environ.get('WARM_UP') == '1'
+    if warm_up:
+        warm_up_engine()
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
@@ -0,0 +1,396 @@
+"""Benchmark suite and regression gate for the trading engine and API.
+
+Run from the backend directory:
+
+    python -m benchmarks.run --profile small --output results.json
+    python -m benchmarks.run --baseline results.json --threshold 0.2
+
+All data is generated deterministically, so no network access is needed.
+With --baseline the run exits with status 1 when any benchmark's median
+time is more than --threshold slower than in the baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Keep every store the app opens in a scratch directory and off the network.
+# This has to happen before trading_engine reads its defaults.
+SCRATCH = tempfile.mkdtemp(prefix='bench-')
+os.environ.update({
+    'BAR_STORE_DIR': os.path.join(SCRATCH, 'bars'),
+    'BAR_PROVIDER': 'synthetic',
+    'LEDGER_DB': os.path.join(SCRATCH, 'ledger.db'),
+    'STATE_DB': os.path.join(SCRATCH, 'state.db'),
+    'RESULT_CACHE_DB': os.path.join(SCRATCH, 'results.db'),
+    'PRICE_STREAM_SOURCE': 'synthetic'
+})
+
+import numpy as np
+import pandas as pd
+
+from trading_engine import indicators
+from trading_engine.data_store import BarStore, synthetic_bars
+from trading_engine.execution import ExecutionSimulator
+from trading_engine.ledger import Ledger
+from trading_engine.optimizer import optimize
+from trading_engine.portfolio import PortfolioStrategy
+from trading_engine.strategy import TradingStrategy
+
+PROFILES = {
+    'small': {'bars': [1000, 10000], 'symbols': [1, 10], 'requests': 200},
+    'medium': {'bars': [100000, 1000000], 'symbols': [100], 'requests': 1000},
+    'large': {'bars': [10000000], 'symbols': [1000], 'requests': 2000},
+    'full': {'bars': [1000, 100000, 1000000, 10000000], 'symbols': [1, 10, 100, 1000], 'requests': 1000}
+}
+
+PARAMS = {'ma_window': 20, 'rsi_window': 14, 'rsi_overbought': 55, 'rsi_oversold': 45}
+
+# Bars per symbol in the multi-symbol portfolio benchmarks (ten years of days)
+PANEL_BARS = 2520
+
+
+class FrameProvider:
+    """Serve pre-generated bars to a BarStore"""
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def history(self, symbol, start, end, interval='1d'):
+        data = self.frames[symbol]
+        return data[(data.index >= start) & (data.index < end)]
+
+
+def make_bars(n_bars, symbol='SYN', seed=0):
+    """n_bars deterministic minute bars"""
+    index = pd.date_range('2000-01-03', periods=n_bars, freq='min', tz='UTC')
+    return synthetic_bars(index, symbol, seed)
+
+
+def measure(fn, repeat=5, number=None):
+    """Run fn once to warm up, then time repeat rounds of number calls.
+
+    Without number, enough calls are batched into each round for it to
+    take about 20 ms, which keeps sub-millisecond timings stable.
+    """
+    started = time.perf_counter()
+    fn()
+    if number is None:
+        number = max(1, min(1000, int(0.02 / max(time.perf_counter() - started, 1e-6))))
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - started) / number)
+    return {
+        'median': statistics.median(times),
+        'min': min(times),
+        'mean': statistics.mean(times),
+        'repeat': repeat,
+        'number': number
+    }
+
+
+def _strategy(data):
+    strategy = TradingStrategy('SYN', data.index[0], data.index[-1])
+    strategy.data = data.copy()
+    return strategy
+
+
+def engine_cases(profile):
+    """Yield (name, fn, repeat) micro-benchmarks of the engine functions"""
+    for n in profile['bars']:
+        data = make_bars(n)
+        close = data['Close']
+        repeat = 3 if n >= 1000000 else 5
+
+        yield 'indicators.sma/{}'.format(n), lambda: indicators.sma(close, 20), repeat
+        yield 'indicators.rsi/{}'.format(n), lambda: indicators.rsi(close, 14), repeat
+
+        strategy = _strategy(data)
+        yield 'calculate_rsi/{}'.format(n), lambda: strategy.calculate_rsi(14), repeat
+        yield 'backtest/{}'.format(n), lambda: strategy.backtest(PARAMS), repeat
+
+        performer = _strategy(data)
+        performer.backtest(PARAMS)
+        yield 'calculate_performance/{}'.format(n), performer.calculate_performance, repeat
+
+        simulator = ExecutionSimulator()
+        yield 'execution.close_fill/{}'.format(n), lambda: simulator.run(performer.data, performer.trades), repeat
+        costly = ExecutionSimulator.from_config({'fill': 'next_open', 'volume_limit': 0.1, 'spread_bps': 2})
+        yield 'execution.next_open/{}'.format(n), lambda: costly.run(performer.data, performer.trades), repeat
+
+        store = BarStore(os.path.join(SCRATCH, 'chunked-{}'.format(n)), FrameProvider({'SYN': data}))
+        chunked = TradingStrategy('SYN', data.index[0], data.index[-1] + pd.Timedelta(minutes=1), store=store)
+        yield 'backtest_chunked/{}'.format(n), lambda: chunked.backtest_chunked(PARAMS, interval='1m'), repeat
+
+        if n <= 100000:
+            def stream(values=close.to_numpy()):
+                indicators.StreamingRSI(14).update_many(values)
+            yield 'streaming_rsi/{}'.format(n), stream, repeat
+
+            grid = {'ma_window': [10, 20, 50, 100], 'rsi_window': [7, 14], 'rsi_oversold': [30, 40]}
+            yield 'optimize/{}'.format(n), lambda: optimize(strategy, grid, max_workers=1), 3
+
+    for k in profile['symbols']:
+        frames = {'S{}'.format(i): make_bars(PANEL_BARS, 'S{}'.format(i)) for i in range(k)}
+        panel = PortfolioStrategy(list(frames), None, None)
+        panel.data = pd.DataFrame({symbol: data['Close'] for symbol, data in frames.items()})
+        yield 'portfolio.backtest/{}x{}'.format(k, PANEL_BARS), lambda: panel.backtest(PARAMS), 3
+
+    ledger = Ledger(os.path.join(SCRATCH, 'bench-ledger.db'))
+    trade = {'symbol': 'AAPL', 'type': 'buy', 'quantity': 1, 'price': 150.0}
+    yield 'ledger.add_trade', lambda: ledger.add_trade(trade), 5
+
+
+def _latencies(client_factory, request, total, concurrency):
+    """Issue total requests from concurrency threads.
+
+    Returns the per-request latencies in seconds, the number of 5xx
+    responses and the wall time.
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    per_thread = [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+
+    def worker(count):
+        client = client_factory()
+        local = []
+        failed = 0
+        for _ in range(count):
+            started = time.perf_counter()
+            response = request(client)
+            local.append(time.perf_counter() - started)
+            failed += response.status_code >= 500
+        with lock:
+            latencies.extend(local)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=worker, args=(count,)) for count in per_thread]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, sum(errors), time.perf_counter() - started
+
+
+def api_cases(profile, concurrency=8):
+    """Load test the /api routes through the Flask test client"""
+    import app as application
+
+    flask_app = application.create_app()
+    flask_app.testing = True
+    trade = {'symbol': 'SYN', 'type': 'buy', 'quantity': 1, 'price': 100.0}
+    routes = {
+        'GET /api/portfolio': lambda c: c.get('/api/portfolio'),
+        'GET /api/trades': lambda c: c.get('/api/trades?limit=100'),
+        'POST /api/trades': lambda c: c.post('/api/trades', json=trade),
+        'GET /api/stock/<symbol>': lambda c: c.get('/api/stock/SYN'),
+        'GET /api/market-data/<symbol>': lambda c: c.get('/api/market-data/SYN'),
+        'GET /api/indicators': lambda c: c.get('/api/indicators'),
+        'GET /api/strategies': lambda c: c.get('/api/strategies'),
+        'GET /api/data-cache/stats': lambda c: c.get('/api/data-cache/stats')
+    }
+
+    results = {}
+    for name, request in routes.items():
+        request(flask_app.test_client())
+        latencies, errors, elapsed = _latencies(flask_app.test_client, request, profile['requests'], concurrency)
+        latencies.sort()
+        results['api {}'.format(name)] = {
+            'median': latencies[len(latencies) // 2],
+            'p95': latencies[int(len(latencies) * 0.95)],
+            'p99': latencies[int(len(latencies) * 0.99)],
+            'mean': statistics.mean(latencies),
+            'requests': len(latencies),
+            'errors': errors,
+            'concurrency': concurrency,
+            'requests_per_sec': len(latencies) / elapsed
+        }
+
+    # Submit a backtest and poll it to completion; each round uses new
+    # params so the result cache does not answer it
+    client = flask_app.test_client()
+    times = []
+    for rsi_window in range(10, 15):
+        started = time.perf_counter()
+        job = client.post('/api/backtest', json={
+            'symbol': 'SYN', 'start_date': '2015-01-01', 'end_date': '2020-01-01',
+            'params': dict(PARAMS, rsi_window=rsi_window)
+        }).get_json()
+        while job['status'] not in ('done', 'failed'):
+            time.sleep(0.005)
+            job = client.get('/api/backtest/{}'.format(job['id'])).get_json()
+        if job['status'] == 'failed':
+            raise RuntimeError('Backtest job failed: {}'.format(job['error']))
+        times.append(time.perf_counter() - started)
+    results['api POST /api/backtest (until done)'] = {
+        'median': statistics.median(times),
+        'min': min(times),
+        'mean': statistics.mean(times),
+        'repeat': len(times),
+        'number': 1
+    }
+    application.get_backtest_queue().executor.shutdown()
+    return results
+
+
+# Runs in a fresh interpreter: time `import app` and the first request, and
+# report peak RSS and whether pandas was loaded
+STARTUP_SCRIPT = '''
+import json, resource, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app().test_client().get(sys.argv[1])
+json.dump({
+    'import': imported - started,
+    'first_request': time.perf_counter() - imported,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'pandas_loaded': 'pandas' in sys.modules
+}, sys.stdout)
+'''
+
+
+def startup_cases(repeat=5):
+    """Cold start of the Flask app, each round in a new process"""
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = {}
+    for route in ('/api/portfolio', '/api/stock/SYN'):
+        runs = [
+            json.loads(subprocess.run(
+                [sys.executable, '-c', STARTUP_SCRIPT, route], cwd=backend,
+                check=True, capture_output=True, text=True
+            ).stdout)
+            for _ in range(repeat)
+        ]
+        if route == '/api/portfolio':
+            imports = [r['import'] for r in runs]
+            results['startup import app'] = {
+                'median': statistics.median(imports),
+                'min': min(imports),
+                'repeat': repeat,
+                'number': 1,
+                'rss_mb': statistics.median(r['rss_mb'] for r in runs),
+                'pandas_loaded': runs[0]['pandas_loaded']
+            }
+        times = [r['import'] + r['first_request'] for r in runs]
+        results['startup first GET {}'.format(route)] = {
+            'median': statistics.median(times),
+            'min': min(times),
+            'repeat': repeat,
+            'number': 1,
+            'rss_mb': statistics.median(r['rss_mb'] for r in runs)
+        }
+    return results
+
+
+def compare(current, baseline, threshold):
+    """Rows of (name, baseline, current, ratio, status) for every benchmark"""
+    rows = []
+    for name in sorted(set(current) | set(baseline)):
+        if name not in baseline:
+            rows.append((name, None, current[name]['median'], None, 'new'))
+        elif name not in current:
+            rows.append((name, baseline[name]['median'], None, None, 'missing'))
+        else:
+            before, after = baseline[name]['median'], current[name]['median']
+            ratio = after / before if before else float('inf')
+            if ratio > 1 + threshold:
+                status = 'SLOWER'
+            elif ratio < 1 / (1 + threshold):
+                status = 'faster'
+            else:
+                status = 'ok'
+            rows.append((name, before, after, ratio, status))
+    return rows
+
+
+def _ms(seconds):
+    return '-' if seconds is None else '{:.3f}'.format(seconds * 1000)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='small')
+    parser.add_argument('--only', help='run only benchmarks whose name contains this text')
+    parser.add_argument('--no-api', action='store_true', help='skip the Flask load test')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads in the load test')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against a previous results file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed slowdown before failing, as a fraction (default 0.2)')
+    args = parser.parse_args(argv)
+    profile = PROFILES[args.profile]
+
+    results = {}
+    try:
+        for name, fn, repeat in engine_cases(profile):
+            if args.only and args.only not in name:
+                continue
+            results[name] = measure(fn, repeat=repeat)
+            print('{:<45} {:>12} ms'.format(name, _ms(results[name]['median'])), flush=True)
+
+        if not args.no_api:
+            # Before the load test imports the app into this process
+            for name, result in startup_cases().items():
+                if args.only and args.only not in name:
+                    continue
+                results[name] = result
+                print('{:<45} {:>12} ms'.format(name, _ms(result['median'])), flush=True)
+            for name, result in api_cases(profile, args.concurrency).items():
+                if args.only and args.only not in name:
+                    continue
+                results[name] = result
+                print('{:<45} {:>12} ms'.format(name, _ms(result['median'])), flush=True)
+    finally:
+        shutil.rmtree(SCRATCH, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'profile': args.profile,
+            'created': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        if args.only:
+            baseline = {k: v for k, v in baseline.items() if args.only in k}
+        rows = compare(results, baseline, args.threshold)
+        print()
+        print('{:<45} {:>12} {:>12} {:>8}  {}'.format('benchmark', 'baseline ms', 'current ms', 'ratio', 'status'))
+        for name, before, after, ratio, status in rows:
+            print('{:<45} {:>12} {:>12} {:>8}  {}'.format(
+                name, _ms(before), _ms(after), '-' if ratio is None else '{:.2f}'.format(ratio), status
+            ))
+        slower = [row for row in rows if row[4] == 'SLOWER']
+        if slower:
+            print('\n{} benchmark(s) more than {:.0%} slower than the baseline'.format(len(slower), args.threshold))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""Multi-process check of the shared data plane.
+
+Run from the backend directory:
+
+    python -m benchmarks.workers --workers 4 --bars 500000
+
+Starts several app processes on one scratch data directory, as a
+multi-worker WSGI server would, and checks that:
+
+- trades, positions, users, sessions, saved strategies and backtest jobs
+  written through one worker are seen through every other worker
+- bars missing from the bar store are fetched once, even when every
+  worker asks for them at the same time
+- bars read by every worker share memory: the proportional set size (PSS)
+  each worker adds is compared with what a private copy of the bars adds
+
+All data is generated, so no network access is needed. Exits with status 1
+if any check fails.
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+SYMBOL = 'SYN'
+BARS_START = '2020-01-01'
+
+
+def _memory():
+    """Resident and proportional set size of this process in bytes (Linux only)"""
+    memory = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss'):
+                    memory[key.lower()] = int(value.split()[0]) * 1024
+    except OSError:
+        return None
+    return memory
+
+
+def _worker(conn):
+    """One app process: serve requests and bar loads sent over conn until it receives None"""
+    import app as application
+    from trading_engine.data_store import get_bar_store
+
+    client = application.create_app().test_client(use_cookies=False)
+    store = get_bar_store()
+    frames = []
+    conn.send('ready')
+    while True:
+        command = conn.recv()
+        if command is None:
+            break
+        kind, args = command
+        if kind == 'request':
+            method, path, kwargs = args
+            response = client.open(path, method=method, **kwargs)
+            body = response.get_json(silent=True)
+            conn.send((response.status_code, body if body is not None else response.get_data(as_text=True),
+                       response.headers.getlist('Set-Cookie')))
+        elif kind == 'load':
+            symbol, bars, private = args
+            end = pd.Timestamp(BARS_START, tz='UTC') + pd.Timedelta(minutes=bars)
+            frame = store.history(symbol, BARS_START, end, interval='1m')
+            if private:
+                frame = frame.copy(deep=True)
+            # Touch every value so the pages are resident
+            frame.to_numpy().sum()
+            frames.append(frame)
+            conn.send((len(frame), store.provider_calls))
+        elif kind == 'memory':
+            conn.send(_memory())
+    application.get_backtest_queue().executor.shutdown()
+    conn.close()
+
+
+class Workers:
+    """A pool of app processes addressed by index"""
+
+    def __init__(self, count):
+        context = multiprocessing.get_context('spawn')
+        self.conns = []
+        self.processes = []
+        for _ in range(count):
+            parent, child = context.Pipe()
+            # Not daemonic: each app process starts its own backtest pool
+            process = context.Process(target=_worker, args=(child,))
+            process.start()
+            self.conns.append(parent)
+            self.processes.append(process)
+        for conn in self.conns:
+            conn.recv()
+
+    def __len__(self):
+        return len(self.conns)
+
+    def call(self, i, kind, *args):
+        conn = self.conns[i % len(self.conns)]
+        conn.send((kind, args))
+        return conn.recv()
+
+    def request(self, i, method, path, **kwargs):
+        return self.call(i, 'request', method, path, kwargs)
+
+    def everywhere(self, kind, *args):
+        """Run the same command on every worker at once"""
+        with ThreadPoolExecutor(len(self)) as pool:
+            return list(pool.map(lambda i: self.call(i, kind, *args), range(len(self))))
+
+    def close(self):
+        for conn in self.conns:
+            conn.send(None)
+        for process in self.processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+
+
+def _cookie(set_cookies):
+    """The session cookie from Set-Cookie headers, as a Cookie header value"""
+    for header in set_cookies:
+        if header.startswith('session='):
+            return header.split(';', 1)[0]
+    return None
+
+
+def consistency_checks(workers, trades_per_worker):
+    """Yield (name, ok, detail) for state written through one worker and read through the others"""
+    n = len(workers)
+
+    # Trades: one buy, then concurrent buys through every worker
+    status, trade, _ = workers.request(0, 'POST', '/api/trades',
+                                       json={'symbol': 'XPROC', 'type': 'buy', 'quantity': 7, 'price': 10})
+    quantities = [workers.request(i, 'GET', '/api/portfolio')[1] for i in range(1, n + 1)]
+    quantities = [next((p['quantity'] for p in q['positions'] if p['symbol'] == 'XPROC'), None) for q in quantities]
+    yield 'trade visible in every worker', status == 201 and set(quantities) == {7}, quantities
+
+    def buy(i):
+        for _ in range(trades_per_worker):
+            workers.request(i, 'POST', '/api/trades', json={'symbol': 'XPROC', 'type': 'buy', 'quantity': 1, 'price': 10})
+    with ThreadPoolExecutor(n) as pool:
+        list(pool.map(buy, range(n)))
+    expected = 7 + n * trades_per_worker
+    portfolios = [workers.request(i, 'GET', '/api/portfolio')[1] for i in range(n)]
+    quantities = [next(p['quantity'] for p in q['positions'] if p['symbol'] == 'XPROC') for q in portfolios]
+    totals = {q['total_value'] for q in portfolios}
+    yield 'concurrent trades all applied', set(quantities) == {expected} and len(totals) == 1, \
+        'quantity {} in every worker (expected {})'.format(quantities, expected)
+    trades = workers.request(n - 1, 'GET', '/api/trades?symbol=XPROC&limit=1000')[1]
+    yield 'trade log complete', len(trades) == 1 + n * trades_per_worker, '{} trades'.format(len(trades))
+
+    # Users and sessions: register, log in, use and end the session on different workers
+    _, page, _ = workers.request(0, 'POST', '/register', data={'username': 'ada', 'password': 'pw'})
+    phrase = re.search(r'<strong>(.*?)</strong>', page).group(1)
+    status, _, set_cookies = workers.request(1, 'POST', '/login',
+                                             data={'username': 'ada', 'password': 'pw', 'special_phrase': phrase})
+    cookie = _cookie(set_cookies)
+    yield 'login through another worker', status == 302 and cookie is not None, status
+    home = workers.request(2, 'GET', '/', headers={'Cookie': cookie})[1]
+    yield 'session visible in every worker', 'Welcome, ada' in home, 'home page greets the user'
+    balances = [workers.request(i, 'POST', '/add-funds', json={'amount': 5}, headers={'Cookie': cookie})[1]['balance']
+                for i in range(n)]
+    yield 'balance shared', balances == [5.0 * (i + 1) for i in range(n)], balances
+    workers.request(3, 'GET', '/logout', headers={'Cookie': cookie})
+    home = workers.request(0, 'GET', '/', headers={'Cookie': cookie})[1]
+    yield 'logout ends the session everywhere', 'Welcome, ada' not in home, 'home page after logout'
+
+    # Saved strategies get unique ids however many workers save at once
+    with ThreadPoolExecutor(n) as pool:
+        saved = list(pool.map(
+            lambda i: workers.request(i, 'POST', '/api/strategies', json={'name': 'strategy {}'.format(i)})[1],
+            range(n)
+        ))
+    listed = workers.request(0, 'GET', '/api/strategies')[1]
+    ids = sorted(s['id'] for s in saved)
+    yield 'strategies shared with unique ids', ids == sorted(s['id'] for s in listed) and len(set(ids)) == n, ids
+
+    # A backtest submitted to one worker can be polled through another
+    status, job, _ = workers.request(0, 'POST', '/api/backtest', json={
+        'symbol': SYMBOL, 'start_date': '2018-01-01', 'end_date': '2020-01-01', 'params': {}
+    })
+    deadline = time.time() + 120
+    while status in (200, 202) and job['status'] not in ('done', 'failed') and time.time() < deadline:
+        time.sleep(0.05)
+        status, job, _ = workers.request(1, 'GET', '/api/backtest/{}'.format(job['id']))
+    yield 'backtest job polled through another worker', job.get('status') == 'done', job.get('status', job)
+
+
+def memory_checks(workers, bars):
+    """Yield (name, ok, detail) for bars loaded by every worker at once.
+
+    The SHARED symbol's bars are already in the store; loading a few of
+    them first means the measurement only covers the bars themselves.
+    """
+    loaded = workers.everywhere('load', 'FETCHED', 10000, False)
+    calls = sum(c for _, c in loaded)
+    yield 'missing bars fetched once', calls == 1, '{} provider calls from {} workers'.format(calls, len(workers))
+
+    workers.everywhere('load', 'SHARED', 1000, False)
+    before = workers.everywhere('memory')
+    loaded = workers.everywhere('load', 'SHARED', bars, False)
+    yield 'every worker read the same bars', len({rows for rows, _ in loaded}) == 1, [rows for rows, _ in loaded]
+    if before[0] is None:
+        yield 'workers share the bar pages', True, 'skipped: /proc/self/smaps_rollup is not available'
+        return
+    shared = workers.everywhere('memory')
+    workers.everywhere('load', 'SHARED', bars, True)
+    private = workers.everywhere('memory')
+
+    def added(after, start, key):
+        return sum(a[key] - b[key] for a, b in zip(after, start)) / 2 ** 20
+
+    # Each worker still builds its own DatetimeIndex, so only the OHLCV
+    # values (40 of the 48 bytes per bar) are shared
+    detail = ('{:.0f} MB of bars, {} workers: shared views add {:.0f} MB RSS / {:.0f} MB PSS in total, '
+              'private copies add {:.0f} MB RSS / {:.0f} MB PSS').format(
+        bars * 48 / 2 ** 20, len(workers), added(shared, before, 'rss'), added(shared, before, 'pss'),
+        added(private, shared, 'rss'), added(private, shared, 'pss'))
+    yield 'workers share the bar pages', added(shared, before, 'pss') < added(private, shared, 'pss'), detail
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='app processes to start (default 4)')
+    parser.add_argument('--bars', type=int, default=500000, help='1m bars every worker loads (default 500000)')
+    parser.add_argument('--trades', type=int, default=25, help='trades posted through each worker (default 25)')
+    args = parser.parse_args(argv)
+
+    # Every worker inherits the same scratch stores
+    scratch = tempfile.mkdtemp(prefix='workers-')
+    os.environ.update({
+        'BAR_STORE_DIR': os.path.join(scratch, 'bars'),
+        'BAR_PROVIDER': 'synthetic',
+        'LEDGER_DB': os.path.join(scratch, 'ledger.db'),
+        'STATE_DB': os.path.join(scratch, 'state.db'),
+        'RESULT_CACHE_DB': os.path.join(scratch, 'results.db'),
+        'PRICE_STREAM_SOURCE': 'synthetic',
+        'BACKTEST_WORKERS': '1'
+    })
+    # Published once, before the workers start, as a data loader would
+    from trading_engine.data_store import BarStore, SyntheticProvider
+    BarStore(provider=SyntheticProvider()).history(
+        'SHARED', BARS_START, pd.Timestamp(BARS_START, tz='UTC') + pd.Timedelta(minutes=args.bars), interval='1m'
+    )
+
+    failed = 0
+    workers = Workers(args.workers)
+    try:
+        checks = list(consistency_checks(workers, args.trades)) + list(memory_checks(workers, args.bars))
+    finally:
+        workers.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+    for name, ok, detail in checks:
+        failed += not ok
+        print('{:<45} {:<6} {}'.format(name, 'ok' if ok else 'FAILED', detail), flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
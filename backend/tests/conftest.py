@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+# Run from the backend directory or the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trading_engine.data_store import BarStore, SyntheticProvider
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A bar store on generated data in a scratch directory"""
+    return BarStore(root=str(tmp_path / 'bars'), provider=SyntheticProvider())
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, store):
+    """A Flask test client with every store in a scratch directory and backtests run in threads"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    import app as application
+    from trading_engine import data_store, result_cache
+    from trading_engine.cache import TTLCache
+    from trading_engine.jobs import BacktestQueue
+    from trading_engine.ledger import Ledger
+    from trading_engine.price_stream import PriceStream, SyntheticTickSource
+    from trading_engine.state_store import StateStore
+
+    state = StateStore(str(tmp_path / 'state.db'))
+    monkeypatch.setattr(data_store, '_default_store', store)
+    monkeypatch.setattr(result_cache, '_default_cache', result_cache.ResultCache(str(tmp_path / 'results.db')))
+    monkeypatch.setattr(application, '_ledger', Ledger(str(tmp_path / 'ledger.db')))
+    monkeypatch.setattr(application, '_state_store', state)
+    monkeypatch.setattr(application, '_backtest_queue', BacktestQueue(executor=ThreadPoolExecutor(2), store=state))
+    monkeypatch.setattr(application, '_price_stream', PriceStream(SyntheticTickSource()))
+    monkeypatch.setattr(application, 'price_history_cache', TTLCache(maxsize=256, ttl=60))
+    application.app.testing = True
+    yield application.create_app().test_client()
+    application.get_backtest_queue().executor.shutdown()
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from trading_engine.cache import SingleFlight, TTLCache
+
+
+def _call_concurrently(flight, key, loader, n_threads=8):
+    results, errors = [], []
+    start = threading.Barrier(n_threads)
+
+    def caller():
+        start.wait()
+        try:
+            results.append(flight.do(key, loader))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=caller) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_callers_share_one_load():
+    flight = SingleFlight()
+    calls = []
+    started, release = threading.Event(), threading.Event()
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return object()
+
+    threads, results, errors = _call_concurrently(flight, 'AAPL', loader)
+    started.wait()
+    # Let the other callers reach the in-flight call before it finishes
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+
+
+def test_concurrent_callers_share_the_error():
+    flight = SingleFlight()
+    calls = []
+    started, release = threading.Event(), threading.Event()
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait()
+        raise KeyError('AAPL')
+
+    threads, results, errors = _call_concurrently(flight, 'AAPL', loader)
+    started.wait()
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert not results
+    assert len(errors) == 8 and all(isinstance(e, KeyError) for e in errors)
+
+
+def test_finished_calls_are_not_reused():
+    flight = SingleFlight()
+    assert flight.do('AAPL', lambda: 1) == 1
+    assert flight.do('AAPL', lambda: 2) == 2
+    assert flight.do('MSFT', lambda: 3) == 3
+
+
+def test_ttl_cache_evicts_the_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats() == {'size': 2, 'hits': 3, 'misses': 1, 'hit_ratio': pytest.approx(0.75)}
+
+
+def test_ttl_cache_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    now[0] += 59
+    assert cache.get('a') == 1
+    now[0] += 2
+    assert cache.get('a', 'missing') == 'missing'
+    assert cache.stats()['size'] == 0
@@ -0,0 +1,94 @@
+import pytest
+
+from trading_engine.compiler import compile_strategy
+from trading_engine.strategy import TradingStrategy
+
+PARAMS = {'ma_window': 50, 'rsi_window': 14, 'rsi_oversold': 48, 'rsi_overbought': 52}
+
+
+def rsi_ma_graph(params):
+    """The RSI/MA rule as the Strategy Builder saves it, with numbers typed as text"""
+    return {
+        'id': 1,
+        'name': 'RSI + MA',
+        'lastModified': '2026-01-01T00:00:00',
+        'blocks': [
+            {'id': 'sma-1712345678001', 'type': 'indicator', 'name': 'Simple Moving Average',
+             'params': {'period': str(params['ma_window'])}},
+            {'id': 'rsi-1712345678002', 'type': 'indicator', 'name': 'Relative Strength Index',
+             'params': {'period': str(params['rsi_window'])}},
+            {'id': 'indicator_below-1712345678003', 'type': 'condition', 'name': 'Indicator Below',
+             'params': {'indicator1': 'rsi-1712345678002', 'value': str(params['rsi_oversold'])}},
+            {'id': 'price_above-1712345678004', 'type': 'condition', 'name': 'Price Above',
+             'params': {'value': 0, 'indicator': 'sma-1712345678001'}},
+            {'id': 'buy-1712345678005', 'type': 'action', 'name': 'Buy', 'params': {'quantity': 1}},
+            {'id': 'indicator_above-1712345678006', 'type': 'condition', 'name': 'Indicator Above',
+             'params': {'indicator1': 'rsi-1712345678002', 'value': str(params['rsi_overbought'])}},
+            {'id': 'price_below-1712345678007', 'type': 'condition', 'name': 'Price Below',
+             'params': {'value': 0, 'indicator': 'sma-1712345678001'}},
+            {'id': 'sell-1712345678008', 'type': 'action', 'name': 'Sell', 'params': {'quantity': 1}},
+        ]
+    }
+
+
+def test_builder_graph_matches_the_hand_written_strategy(store):
+    reference = TradingStrategy('SYN', '2010-01-01', '2020-01-01', store=store)
+    expected = reference.backtest(PARAMS)
+
+    compiled = TradingStrategy('SYN', '2010-01-01', '2020-01-01', store=store)
+    result = compiled.backtest_plan(compile_strategy(rsi_ma_graph(PARAMS)))
+
+    assert len(reference.trades) > 0
+    assert [(t['date'], t['type'], t['position']) for t in compiled.trades] == \
+        [(t['date'], t['type'], t['position']) for t in reference.trades]
+    for key in ('total_return', 'sharpe_ratio', 'max_drawdown', 'win_rate'):
+        assert result[key] == pytest.approx(expected[key])
+
+
+def test_shared_indicators_are_one_node():
+    plan = compile_strategy(rsi_ma_graph(PARAMS))
+    assert [key for key in plan.nodes if key[0] == 'sma'] == [('sma', 50)]
+    assert [key for key in plan.nodes if key[0] == 'rsi'] == [('rsi', 14)]
+
+
+def _with_block(block, replace=None):
+    graph = rsi_ma_graph(PARAMS)
+    if replace is None:
+        graph['blocks'].insert(2, block)
+    else:
+        graph['blocks'][replace] = block
+    return graph
+
+
+@pytest.mark.parametrize('graph, message', [
+    (_with_block({'id': 'macd-1', 'type': 'indicator', 'params': {'period': 12}}), 'Unknown indicator'),
+    (_with_block({'id': 'note-1', 'type': 'comment', 'params': {}}), 'Unknown block type'),
+    (_with_block({'id': 'price_between-1', 'type': 'condition', 'params': {}}), 'Unknown condition'),
+    # A condition that reads its own output
+    (_with_block({'id': 'cross_above-9', 'type': 'condition', 'name': 'Cross Above',
+                  'params': {'indicator1': 'cross_above-9', 'indicator2': 'sma-1712345678001'}}),
+     'must refer to an indicator'),
+    # A condition that reads another condition
+    (_with_block({'id': 'price_above-9', 'type': 'condition', 'name': 'Price Above',
+                  'params': {'value': 0, 'indicator': 'indicator_below-1712345678003'}}, replace=3),
+     'must refer to an indicator'),
+])
+def test_invalid_graphs_are_rejected(graph, message):
+    with pytest.raises(ValueError, match=message):
+        compile_strategy(graph)
+
+
+@pytest.mark.parametrize('block', [
+    {'id': 'note-1', 'type': 'comment', 'params': {}},
+    {'id': 'cross_below-9', 'type': 'condition', 'name': 'Cross Below',
+     'params': {'indicator1': 'sma-1712345678001', 'indicator2': 'cross_below-9'}},
+])
+def test_backtest_request_rejects_invalid_graphs(client, block):
+    graph = _with_block(block)
+    del graph['id']
+    saved = client.post('/api/strategies', json=graph).get_json()
+    response = client.post('/api/backtest', json={
+        'symbol': 'SYN', 'start_date': '2010-01-01', 'end_date': '2020-01-01', 'strategy_id': saved['id']
+    })
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pandas as pd
+
+from trading_engine.data_store import BarStore, SyntheticProvider
+
+
+class SlowProvider(SyntheticProvider):
+    """Generated bars behind a fixed network latency"""
+
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+
+    def history(self, symbol, start, end, interval='1d'):
+        time.sleep(self.latency)
+        return super().history(symbol, start, end, interval)
+
+
+def test_serves_stored_range_and_fetches_only_gaps(store):
+    first = store.history('SYN', '2020-01-01', '2020-06-01')
+    again = store.history('SYN', '2020-02-01', '2020-03-01')
+    wider = store.history('SYN', '2019-06-01', '2020-09-01')
+    assert store.stats()['provider_calls'] == 3
+    assert store.stats()['hits'] == 1
+    pd.testing.assert_frame_equal(again, first.loc['2020-02-01':'2020-02-29'])
+    pd.testing.assert_frame_equal(wider.loc[first.index], first)
+    expected = SyntheticProvider().history('SYN', '2019-06-01', '2020-09-01')
+    pd.testing.assert_frame_equal(wider, expected, check_freq=False, check_index_type=False)
+
+
+def test_fetches_of_different_symbols_run_in_parallel(tmp_path):
+    store = BarStore(root=str(tmp_path), provider=SlowProvider(0.5))
+    threads = [
+        threading.Thread(target=store.history, args=(symbol, '2020-01-01', '2020-02-01'))
+        for symbol in ('AAA', 'BBB', 'CCC', 'DDD')
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.perf_counter() - started < 1.5
+    assert store.stats()['provider_calls'] == 4
+
+
+class FlakyProvider(SyntheticProvider):
+    """Generated bars, except that the first `failures` calls return nothing"""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def history(self, symbol, start, end, interval='1d'):
+        if self.failures:
+            self.failures -= 1
+            return pd.DataFrame()
+        return super().history(symbol, start, end, interval)
+
+
+def test_empty_first_fetch_is_not_recorded_as_covered(tmp_path):
+    store = BarStore(root=str(tmp_path), provider=FlakyProvider(failures=1))
+    assert store.history('SYN', '2020-01-01', '2020-02-01').empty
+    assert len(store.history('SYN', '2020-01-01', '2020-02-01')) == 23
+    assert store.stats()['provider_calls'] == 2
+
+
+def test_empty_gaps_at_the_edges_are_covered(store):
+    stored = store.history('SYN', '2020-01-06', '2020-01-11')
+    # Weekends on both sides of the stored bars
+    for _ in range(3):
+        wider = store.history('SYN', '2020-01-04', '2020-01-13')
+    assert store.stats()['provider_calls'] == 3
+    assert store.stats()['hits'] == 2
+    pd.testing.assert_frame_equal(wider, stored)
+
+
+def test_open_tail_is_refetched_only_when_stale(tmp_path):
+    store = BarStore(root=str(tmp_path), provider=SyntheticProvider(), tail_ttl=60)
+    first = store.history('SYN', '2020-01-01', pd.Timestamp.now(tz='UTC'))
+    again = store.history('SYN', '2020-01-01', pd.Timestamp.now(tz='UTC'))
+    assert store.stats()['provider_calls'] == 1
+    assert store.stats()['hits'] == 1
+    pd.testing.assert_frame_equal(again, first)
+
+    store.tail_ttl = 0
+    refetched = store.history('SYN', '2020-01-01', pd.Timestamp.now(tz='UTC'))
+    assert store.stats()['provider_calls'] == 2
+    # Refetched bars replace the stored ones they overlap
+    pd.testing.assert_frame_equal(refetched, first)
+    # A range past the fetched tail is never served from it
+    store.tail_ttl = 60
+    store.history('SYN', '2020-01-01', pd.Timestamp.now(tz='UTC') + pd.Timedelta(days=7))
+    assert store.stats()['provider_calls'] == 3
+
+
+def test_empty_open_tail_is_not_refetched_until_stale(tmp_path):
+    store = BarStore(root=str(tmp_path), provider=FlakyProvider(failures=0), tail_ttl=0)
+    store.history('SYN', '2020-01-01', '2020-02-01')
+    # No bars since the stored range, e.g. over a weekend
+    store.provider.failures = 1
+    store.tail_ttl = 60
+    stored = store.history('SYN', '2020-01-01', pd.Timestamp.now(tz='UTC'))
+    again = store.history('SYN', '2020-01-01', pd.Timestamp.now(tz='UTC'))
+    assert store.stats()['provider_calls'] == 2
+    assert len(stored) == len(again) == 23
@@ -0,0 +1,18 @@
+import pytest
+
+from trading_engine.execution import ExecutionSimulator
+from trading_engine.strategy import TradingStrategy
+
+PARAMS = {'rsi_oversold': 45, 'rsi_overbought': 55}
+
+
+def test_default_simulator_matches_plain_backtest_with_shorts(store):
+    strategy = TradingStrategy('SYN', '2010-01-01', '2020-01-01', store=store)
+    expected = strategy.backtest(PARAMS)
+    assert any(t['position'] < 0 for t in strategy.trades)
+
+    result = ExecutionSimulator().run(strategy.data, strategy.trades)
+    assert result['orders']['filled'] == len(strategy.trades)
+    for key, value in expected.items():
+        if key != 'trades':
+            assert result[key] == pytest.approx(value), key
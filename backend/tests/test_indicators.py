@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from trading_engine import indicators
+
+
+@pytest.fixture
+def bars(store):
+    data = store.history('SYN', '2015-01-01', '2020-01-01')
+    # A flat stretch, where the gains, losses and ranges are all zero
+    data = data.copy()
+    data.iloc[300:330] = data.iloc[300].to_numpy()
+    return data.reset_index(drop=True)
+
+
+def _close(batch, streamed):
+    np.testing.assert_allclose(np.asarray(streamed, dtype=float), np.asarray(batch, dtype=float),
+                               rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('window', [5, 20])
+def test_streaming_sma_matches_batch(bars, window):
+    _close(indicators.sma(bars['Close'], window), indicators.StreamingSMA(window).update_many(bars['Close']))
+
+
+@pytest.mark.parametrize('method, batch', [('simple', indicators.rsi), ('wilder', indicators.rsi_wilder)])
+@pytest.mark.parametrize('window', [3, 14])
+def test_streaming_rsi_matches_batch(bars, method, batch, window):
+    streamed = indicators.StreamingRSI(window, method=method).update_many(bars['Close'])
+    _close(batch(bars['Close'], window), streamed)
+
+
+def test_streaming_macd_matches_batch(bars):
+    _close(indicators.macd(bars['Close']), indicators.StreamingMACD().update_many(bars['Close']))
+
+
+def test_streaming_bollinger_bands_match_batch(bars):
+    _close(indicators.bollinger_bands(bars['Close']),
+           indicators.StreamingBollingerBands().update_many(bars['Close']))
+
+
+def test_streaming_stochastic_matches_batch(bars):
+    batch = indicators.stochastic(bars['High'], bars['Low'], bars['Close'])
+    streamed = indicators.StreamingStochastic().update_many(bars['High'], bars['Low'], bars['Close'])
+    _close(batch, streamed)
+
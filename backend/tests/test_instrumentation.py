@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+
+from trading_engine.instrumentation import Registry, SamplingProfiler, capture, record_stage, stage
+
+
+def _lines(registry):
+    return registry.render().splitlines()
+
+
+def test_counter_and_gauge_render_per_label_set():
+    registry = Registry()
+    requests = registry.counter('requests_total', 'Requests')
+    requests.inc(route='/a')
+    requests.inc(2, route='/a')
+    requests.inc(route='/b')
+    depth = registry.gauge('depth', 'Queue depth')
+    depth.inc(3)
+    depth.dec()
+    assert registry.counter('requests_total') is requests
+
+    lines = _lines(registry)
+    assert '# TYPE requests_total counter' in lines
+    assert 'requests_total{route="/a"} 3' in lines
+    assert 'requests_total{route="/b"} 1' in lines
+    assert '# TYPE depth gauge' in lines
+    assert 'depth 2' in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 5):
+        latency.observe(value, route='/a')
+
+    lines = _lines(registry)
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{route="/a"} 6.05' in lines
+    assert 'latency_seconds_count{route="/a"} 4' in lines
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter('errors_total').inc(message='say "hi"\n')
+    assert 'errors_total{message="say \\"hi\\"\\n"} 1' in _lines(registry)
+
+
+def test_a_failing_collector_does_not_break_the_scrape():
+    registry = Registry()
+    registry.register_collector(lambda: 1 / 0)
+    registry.register_collector(lambda: [('queue_depth', 'gauge', 'Depth', [({'queue': 'a'}, 4)])])
+    lines = _lines(registry)
+    assert '# TYPE queue_depth gauge' in lines
+    assert 'queue_depth{queue="a"} 4' in lines
+
+
+def test_capture_collects_this_threads_stages():
+    def other_thread():
+        record_stage('elsewhere', 1.0)
+
+    with capture() as outer:
+        with stage('load'):
+            pass
+        with capture() as inner:
+            record_stage('nested', 0.5)
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+        record_stage('after', 0.25)
+
+    assert inner == [('nested', 0.5)]
+    assert [name for name, _ in outer] == ['load', 'after']
+    assert outer[0][1] >= 0
+
+
+def test_sampling_profiler_records_folded_stacks(tmp_path):
+    def busy_loop():
+        deadline = time.perf_counter() + 0.2
+        while time.perf_counter() < deadline:
+            pass
+
+    profiler = SamplingProfiler(interval=0.001).start()
+    busy_loop()
+    profiler.stop()
+
+    assert profiler.samples > 0
+    assert sum(profiler.stacks.values()) == profiler.samples
+    assert any('busy_loop (test_instrumentation.py:' in stack for stack in profiler.stacks)
+    path = profiler.dump(str(tmp_path / 'profiles' / 'run.folded'))
+    with open(path) as f:
+        stack, count = f.readline().rsplit(' ', 1)
+    assert int(count) == profiler.stacks.most_common(1)[0][1]
+
+
+def test_metrics_endpoint_reports_requests_by_route(client):
+    client.get('/api/portfolio')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/portfolio",status="200"}' in text
+    assert 'cache_hits_total{cache="price_history"}' in text
+
+
+def test_profiled_request_writes_a_folded_profile(client, tmp_path, monkeypatch):
+    import app as application
+
+    monkeypatch.setattr(application, 'PROFILE_DIR', str(tmp_path / 'profiles'))
+    monkeypatch.setitem(application.app.config, 'PROFILING_ENABLED', True)
+    assert 'X-Profile' not in client.get('/api/portfolio').headers
+    response = client.get('/api/portfolio?profile=1')
+    name = response.headers['X-Profile']
+    assert name.endswith('-GET-api_portfolio.folded')
+    assert os.path.exists(os.path.join(str(tmp_path / 'profiles'), name))
@@ -0,0 +1,44 @@
+import threading
+import time
+
+from trading_engine import data_store
+from trading_engine.jobs import BacktestQueue
+
+
+def _wait(queue, job_id, timeout=60):
+    deadline = time.time() + timeout
+    job = queue.get(job_id)
+    while job['status'] not in ('done', 'failed') and time.time() < deadline:
+        time.sleep(0.05)
+        job = queue.get(job_id)
+    return job
+
+
+def test_worker_does_not_inherit_held_locks(tmp_path, monkeypatch, store):
+    # Workers read their stores from the environment
+    monkeypatch.setenv('BAR_STORE_DIR', str(tmp_path / 'bars'))
+    monkeypatch.setenv('BAR_PROVIDER', 'synthetic')
+    monkeypatch.setenv('RESULT_CACHE_DB', str(tmp_path / 'results.db'))
+    monkeypatch.setattr(data_store, '_default_store', store)
+
+    # Another request thread is in the middle of a slow fetch
+    fetching = threading.Event()
+    release = threading.Event()
+
+    def slow_fetch():
+        with store._symbol_lock('SYN', '1d'):
+            fetching.set()
+            release.wait()
+
+    thread = threading.Thread(target=slow_fetch)
+    thread.start()
+    fetching.wait()
+    queue = BacktestQueue(max_workers=1)
+    try:
+        job = queue.submit('SYN', '2018-01-01', '2019-01-01', {'rsi_oversold': 45, 'rsi_overbought': 55})
+        job = _wait(queue, job['id'])
+        assert job['status'] == 'done', job
+    finally:
+        release.set()
+        thread.join()
+        queue.executor.shutdown()
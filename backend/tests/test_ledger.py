@@ -0,0 +1,117 @@
+import multiprocessing
+import sqlite3
+
+import pytest
+
+from trading_engine import state_store
+from trading_engine.ledger import DEFAULT_LEDGER_PATH, SEED_TRADES, Ledger
+
+
+def _open_ledger(path, start, errors):
+    start.wait()
+    try:
+        Ledger(path).close()
+    except Exception as e:
+        errors.put(repr(e))
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='needs fork')
+def test_concurrent_seed_runs_once(tmp_path):
+    # Workers starting together on a new database, as under gunicorn -w 4
+    context = multiprocessing.get_context('fork')
+    for trial in range(20):
+        path = str(tmp_path / 'ledger{}.db'.format(trial))
+        start = context.Barrier(6)
+        errors = context.Queue()
+        processes = [context.Process(target=_open_ledger, args=(path, start, errors)) for _ in range(6)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        assert errors.empty(), errors.get()
+        count = sqlite3.connect(path).execute('SELECT COUNT(*) FROM trades').fetchone()[0]
+        assert count == len(SEED_TRADES)
+
+
+def test_other_process_trades_are_seen(tmp_path):
+    path = str(tmp_path / 'ledger.db')
+    first, second = Ledger(path), Ledger(path)
+    quantity = second.get_position('AAPL')['quantity']
+    first.add_trade({'symbol': 'AAPL', 'type': 'buy', 'quantity': 10, 'price': 150})
+    assert second.get_position('AAPL')['quantity'] == quantity + 10
+    second.add_trade({'symbol': 'AAPL', 'type': 'buy', 'quantity': 5, 'price': 150})
+    assert first.get_position('AAPL')['quantity'] == quantity + 15
+    assert first.portfolio() == second.portfolio()
+
+
+def test_state_writes_do_not_reload_the_ledger(tmp_path, monkeypatch):
+    assert state_store.DEFAULT_STATE_PATH != DEFAULT_LEDGER_PATH
+    ledger = Ledger(str(tmp_path / 'ledger.db'))
+    state = state_store.StateStore(str(tmp_path / 'state.db'))
+    loads = []
+    monkeypatch.setattr(ledger, '_load', lambda: loads.append(1))
+    state.save_session('abc', '{}', 2 ** 40)
+    state.save_job({'id': 'job', 'status': 'queued'})
+    ledger.portfolio()
+    assert loads == []
+
+
+def _all_pages(client, **params):
+    pages, cursor = [], None
+    while True:
+        query = dict(params, cursor=cursor) if cursor else params
+        response = client.get('/api/trades', query_string=query)
+        assert response.status_code == 200
+        pages.append(response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            return pages
+
+
+def _add_trades(client):
+    for i in range(23):
+        trade = {'symbol': ('AAPL', 'MSFT')[i % 2], 'type': ('buy', 'buy', 'sell')[i % 3],
+                 'quantity': 1, 'price': 100 + i}
+        assert client.post('/api/trades', json=trade).status_code == 201
+
+
+def test_trade_pages_have_no_duplicates_or_gaps(client):
+    _add_trades(client)
+    everything = client.get('/api/trades', query_string={'limit': 1000}).get_json()
+    pages = _all_pages(client, limit=5)
+
+    assert all(len(page) == 5 for page in pages[:-1])
+    ids = [trade['id'] for page in pages for trade in page]
+    assert ids == [trade['id'] for trade in everything]
+    assert len(ids) == len(set(ids)) == len(SEED_TRADES) + 23
+    assert [int(i) for i in ids] == sorted(int(i) for i in ids)
+
+
+def test_trade_pages_stay_continuous_while_trades_are_added(client):
+    _add_trades(client)
+    first = client.get('/api/trades', query_string={'limit': 5})
+    client.post('/api/trades', json={'symbol': 'AAPL', 'type': 'buy', 'quantity': 1, 'price': 1})
+    rest = _all_pages(client, limit=5, cursor=first.headers['X-Next-Cursor'])
+    ids = [trade['id'] for trade in first.get_json()] + [trade['id'] for page in rest for trade in page]
+    assert len(ids) == len(set(ids)) == len(SEED_TRADES) + 24
+
+
+@pytest.mark.parametrize('params', [{'symbol': 'MSFT'}, {'side': 'sell'}, {'symbol': 'AAPL', 'side': 'buy'}])
+def test_trade_filters_apply_across_pages(client, params):
+    _add_trades(client)
+    everything = client.get('/api/trades', query_string={'limit': 1000}).get_json()
+    expected = [
+        trade['id'] for trade in everything
+        if trade['symbol'] == params.get('symbol', trade['symbol'])
+        and trade['type'] == params.get('side', trade['type'])
+    ]
+    pages = _all_pages(client, limit=3, **params)
+    assert len(pages) > 1
+    assert [trade['id'] for page in pages for trade in page] == expected
+
+
+@pytest.mark.parametrize('params', [{'cursor': 'abc'}, {'side': 'hold'}, {'limit': 'ten'}])
+def test_invalid_trade_queries_are_rejected(client, params):
+    response = client.get('/api/trades', query_string=params)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
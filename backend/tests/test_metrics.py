@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from trading_engine import metrics
+
+
+def _series(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2010-01-01', periods=n)
+    close = 100 * np.cumprod(1 + rng.normal(0.0003, 0.015, n))
+    # Runs of long, flat and short positions of random length
+    position = np.repeat(rng.choice([-1.0, 0.0, 1.0], size=n), rng.integers(1, 30, size=n))[:n]
+    position[0] = 0
+    return close, position, index
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 999, 1000])
+def test_accumulator_over_chunks_matches_the_full_series(chunk_size):
+    close, position, index = _series()
+    expected = metrics.performance_metrics(close, position, index=index)
+
+    accumulator = metrics.MetricsAccumulator()
+    for start in range(0, len(close), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        accumulator.update(close[chunk], position[chunk], index[chunk])
+    result = accumulator.result()
+
+    assert result.keys() == expected.keys()
+    for key in expected:
+        assert result[key] == pytest.approx(expected[key], rel=1e-9), key
+
+
+def test_accumulator_without_an_index_uses_the_bar_count():
+    close, position, _ = _series(seed=1)
+    expected = metrics.performance_metrics(close, position)
+    accumulator = metrics.MetricsAccumulator()
+    for start in range(0, len(close), 100):
+        accumulator.update(close[start:start + 100], position[start:start + 100])
+    for key, value in accumulator.result().items():
+        assert value == pytest.approx(expected[key], rel=1e-9), key
+
+
+def test_short_position_earns_the_fall_in_price():
+    close = np.array([100.0, 90.0, 80.0])
+    position = np.array([-1.0, -1.0, -1.0])
+    result = metrics.performance_metrics(close, position)
+    # Shorting all equity at 100 and covering at 80 gains 20%
+    assert result['total_return'] == pytest.approx(0.2)
+    assert result['win_rate'] == 1.0
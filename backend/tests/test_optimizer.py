@@ -0,0 +1,46 @@
+import pytest
+
+from trading_engine.optimizer import ASCENDING_METRICS, expand_grid, optimize
+from trading_engine.strategy import TradingStrategy
+
+GRID = {'ma_window': [20, 50], 'rsi_window': [7, 14], 'rsi_oversold': [40, 48], 'rsi_overbought': [52, 60]}
+TOP_N = 5
+
+
+@pytest.fixture
+def strategy(store):
+    strategy = TradingStrategy('SYN', '2010-01-01', '2020-01-01', store=store)
+    strategy.fetch_data()
+    return strategy
+
+
+def _brute_force(strategy, combos, metric):
+    rows = [dict(params, **strategy.backtest(params)) for params in combos]
+    # sorted() is stable, like the optimizer's sort, so ties keep grid order
+    return sorted(rows, key=lambda row: row[metric], reverse=metric not in ASCENDING_METRICS)
+
+
+@pytest.mark.parametrize('metric', ['total_return', 'sharpe_ratio', 'max_drawdown'])
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_top_results_match_a_brute_force_ranking(strategy, metric, max_workers):
+    expected = _brute_force(strategy, expand_grid(GRID), metric)[:TOP_N]
+    results = optimize(strategy, GRID, metric=metric, max_workers=max_workers)['results'].head(TOP_N)
+
+    for (_, row), reference in zip(results.iterrows(), expected):
+        for key in GRID:
+            assert row[key] == reference[key]
+        assert row[metric] == pytest.approx(reference[metric])
+
+
+def test_random_search_samples_the_grid(strategy):
+    combos = expand_grid(GRID, n_iter=6, seed=3)
+    assert combos == expand_grid(GRID, n_iter=6, seed=3)
+    result = optimize(strategy, GRID, n_iter=6, seed=3, max_workers=1)
+    assert result['combinations'] == 6
+    assert sorted(map(tuple, result['results'][sorted(GRID)].to_numpy().tolist())) == \
+        sorted(tuple(params[key] for key in sorted(GRID)) for params in combos)
+
+
+def test_unknown_metric_is_rejected(strategy):
+    with pytest.raises(ValueError, match='Unknown metric'):
+        optimize(strategy, GRID, metric='alpha', max_workers=1)
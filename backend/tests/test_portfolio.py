@@ -0,0 +1,52 @@
+import pytest
+
+from trading_engine.portfolio import PortfolioStrategy
+from trading_engine.strategy import TradingStrategy
+
+PARAMS = {'rsi_oversold': 45, 'rsi_overbought': 55}
+SYMBOLS = ['AAA', 'BBB', 'CCC']
+
+
+def test_portfolio_metrics_report_trading_activity(store):
+    result = PortfolioStrategy(SYMBOLS, '2010-01-01', '2020-01-01', store=store).backtest(PARAMS)
+    assert result['trades'].sum() > 0
+    for key in ('exposure', 'turnover', 'win_rate'):
+        assert result['metrics'][key] > 0, key
+
+
+def test_one_symbol_portfolio_matches_single_backtest(store):
+    result = PortfolioStrategy(['AAA'], '2010-01-01', '2020-01-01', store=store).backtest(PARAMS)
+    expected = TradingStrategy('AAA', '2010-01-01', '2020-01-01', store=store).backtest(PARAMS)
+    for key, value in result['metrics'].items():
+        assert value == pytest.approx(expected[key]), key
+
+
+def test_positions_match_single_symbol_backtests(store):
+    result = PortfolioStrategy(SYMBOLS, '2010-01-01', '2020-01-01', store=store).backtest(PARAMS)
+    for symbol in SYMBOLS:
+        single = TradingStrategy(symbol, '2010-01-01', '2020-01-01', store=store)
+        expected = single.backtest(PARAMS)
+        assert result['positions'][symbol].tolist() == single.position_series().tolist()
+        assert result['trades'][symbol] == len(single.trades)
+        assert result['final_equity'][symbol] / 100000 * len(SYMBOLS) - 1 == pytest.approx(expected['total_return'])
+
+
+def test_chunked_panel_matches_whole_panel(store):
+    portfolio = PortfolioStrategy(SYMBOLS, '2010-01-01', '2020-01-01', store=store)
+    whole = portfolio.backtest(PARAMS)
+    chunked = portfolio.backtest(PARAMS, chunk_size=2)
+    assert chunked['total_return'] == pytest.approx(whole['total_return'])
+    assert chunked['metrics'] == pytest.approx(whole['metrics'])
+    assert (chunked['positions'] == whole['positions']).all().all()
+    assert chunked['memory']['peak_chunk_bytes'] < whole['memory']['peak_chunk_bytes']
+
+
+def test_cash_follows_positions(store):
+    result = PortfolioStrategy(['AAA'], '2010-01-01', '2020-01-01', store=store).backtest(PARAMS)
+    position = result['positions']['AAA'].to_numpy()
+    cash = result['cash'].to_numpy()
+    equity = result['equity'].to_numpy()
+    # Flat sleeves are all cash, longs are fully invested and shorts hold their proceeds
+    assert cash[position == 0] == pytest.approx(equity[position == 0])
+    assert cash[position == 1] == pytest.approx(0, abs=1e-6)
+    assert (cash[position == -1] > equity[position == -1]).all()
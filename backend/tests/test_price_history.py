@@ -0,0 +1,67 @@
+import json
+
+import numpy as np
+import pytest
+
+from trading_engine.columnar import MIMETYPES
+
+ROUTES = ['/api/stock/AAA', '/api/market-data/AAA']
+RANGE = 'start=2020-01-01&end=2020-03-01'
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@pytest.mark.parametrize('route', ROUTES)
+def test_json(client, route):
+    response = client.get('{}?{}'.format(route, RANGE))
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data['dates']) == len(data['prices']) > 0
+    assert data['dates'][0] == '2020-01-01'
+
+
+@pytest.mark.parametrize('route', ROUTES)
+def test_columnar(client, route):
+    response = client.get('{}?{}&format=columnar&fields=open,close'.format(route, RANGE))
+    assert response.status_code == 200
+    assert response.mimetype == MIMETYPES['columnar']
+    data = json.loads(response.data)
+    assert data['symbol'] == 'AAA'
+    assert data['count'] == len(data['timestamps']) == len(data['open']) == len(data['close']) > 0
+    assert data['close'] == client.get('{}?{}'.format(route, RANGE)).get_json()['prices']
+
+
+@pytest.mark.parametrize('route', ROUTES)
+def test_binary(client, route):
+    response = client.get('{}?{}'.format(route, RANGE), headers={'Accept': MIMETYPES['binary']})
+    assert response.status_code == 200
+    rows = int(response.headers['X-Rows'])
+    assert response.headers['X-Columns'] == 'timestamp:int64,close:float64,volume:float64'
+    assert len(response.data) == rows * 8 * 3
+    timestamps = np.frombuffer(response.data[:rows * 8], dtype='<i8')
+    close = np.frombuffer(response.data[rows * 8:rows * 16], dtype='<f8')
+    assert timestamps[0] == 1577836800000
+    assert close.tolist() == client.get('{}?{}'.format(route, RANGE)).get_json()['prices']
+
+
+@pytest.mark.parametrize('route', ROUTES)
+def test_arrow(client, route):
+    response = client.get('{}?{}&format=arrow'.format(route, RANGE))
+    if not _has_pyarrow():
+        assert response.status_code == 406
+        return
+    import pyarrow as pa
+    assert response.status_code == 200
+    table = pa.ipc.open_stream(response.data).read_all()
+    assert table.column_names == ['timestamp', 'close', 'volume']
+
+
+@pytest.mark.parametrize('route', ROUTES)
+def test_unknown_format(client, route):
+    assert client.get('{}?format=xml'.format(route)).status_code == 406
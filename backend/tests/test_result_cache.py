@@ -0,0 +1,90 @@
+import sqlite3
+import time
+
+import pandas as pd
+
+from trading_engine.result_cache import ResultCache
+from trading_engine.strategy import TradingStrategy
+
+PARAMS = {'rsi_oversold': 45, 'rsi_overbought': 55}
+
+
+def _strategy(store, cache):
+    return TradingStrategy('SYN', '2015-01-01', '2020-01-01', store=store, result_cache=cache)
+
+
+def test_cached_backtest_matches_uncached(store, tmp_path):
+    cache = ResultCache(str(tmp_path / 'results.db'))
+    first = _strategy(store, cache)
+    expected = first.backtest(PARAMS)
+    again = _strategy(store, cache)
+    result = again.backtest(PARAMS)
+    assert cache.stats()['hits'] == 1
+    assert result == expected
+    assert again.trades == first.trades
+    assert (again.position_series() == first.position_series()).all()
+
+
+def test_changed_bars_change_the_key(store, tmp_path):
+    cache = ResultCache(str(tmp_path / 'results.db'))
+    _strategy(store, cache).backtest(PARAMS)
+    changed = _strategy(store, cache)
+    changed.fetch_data()
+    changed.data = changed.data.copy()
+    changed.data.iloc[-1, changed.data.columns.get_loc('Close')] *= 1.01
+    changed.backtest(PARAMS)
+    assert cache.stats()['misses'] == 2
+    assert cache.stats()['entries'] == 2
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache = ResultCache(str(tmp_path / 'results.db'), max_bytes=250)
+    value = {'payload': 'x' * 90}
+    cache.put('a', value)
+    cache.put('b', value)
+    assert cache.get('a') == value
+    cache.put('c', value)
+    assert cache.get('b') is None
+    assert cache.get('a') == value
+    assert cache.get('c') == value
+    assert cache.stats()['bytes'] <= 250
+
+
+def test_counters_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'results.db')
+    cache = ResultCache(path)
+    assert cache.get('key') is None
+    cache.put('key', {'total_return': 0.5})
+    assert cache.get('key') == {'total_return': 0.5}
+    assert cache.get('key') == {'total_return': 0.5}
+    stats = ResultCache(path).stats()
+    assert (stats['hits'], stats['misses']) == (0, 1)
+    cache.flush()
+    stats = ResultCache(path).stats()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+
+
+def test_lookups_do_not_wait_for_the_write_lock(tmp_path):
+    path = str(tmp_path / 'results.db')
+    cache = ResultCache(path, flush_interval=60)
+    cache.put('key', {'total_return': 0.5})
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute('BEGIN IMMEDIATE')
+    try:
+        started = time.perf_counter()
+        for _ in range(10):
+            assert cache.get('key') is not None
+            assert cache.get('missing') is None
+        assert time.perf_counter() - started < 1
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+def test_results_are_stored_as_json(tmp_path):
+    path = str(tmp_path / 'results.db')
+    cache = ResultCache(path)
+    cache.put('key', {'date': pd.Timestamp('2020-01-02', tz='UTC'), 'values': (1, 2)})
+    with sqlite3.connect(path) as conn:
+        stored = conn.execute('SELECT value FROM results').fetchone()[0]
+    assert stored == '{"date": "2020-01-02T00:00:00+00:00", "values": [1, 2]}'
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from trading_engine import metrics
+from trading_engine.optimizer import optimize
+from trading_engine.robustness import monte_carlo, path_metrics, resample_paths, walk_forward
+from trading_engine.strategy import TradingStrategy
+
+PARAMS = {'rsi_oversold': 45, 'rsi_overbought': 55}
+GRID = {'ma_window': [10, 50], 'rsi_window': [7, 14], 'rsi_oversold': [40, 45], 'rsi_overbought': [55, 60]}
+
+
+@pytest.fixture
+def strategy(store):
+    strategy = TradingStrategy('SYN', '2012-01-01', '2020-01-01', store=store)
+    strategy.fetch_data()
+    return strategy
+
+
+def test_walk_forward_trades_the_in_sample_winner(strategy):
+    result = walk_forward(strategy, GRID, train_bars=500, test_bars=250, max_workers=1)
+    windows = result['windows']
+    assert len(windows) == (len(strategy.data) - 500 - 250) // 250 + 1
+    # Test windows follow their train windows and do not overlap each other
+    assert (windows['test_start'] > windows['train_end']).all()
+    assert (windows['test_start'].iloc[1:].to_numpy() > windows['test_end'].iloc[:-1].to_numpy()).all()
+
+    first = windows.iloc[0]
+    train = TradingStrategy('SYN', None, None)
+    train.data = strategy.data.iloc[:500]
+    best = optimize(train, GRID, max_workers=1)['results'].iloc[0]
+    for key in GRID:
+        assert first[key] == best[key]
+    assert first['in_sample_total_return'] == pytest.approx(best['total_return'])
+
+
+def test_walk_forward_is_the_same_in_a_process_pool(strategy):
+    serial = walk_forward(strategy, GRID, train_bars=500, test_bars=250, max_workers=1)
+    pooled = walk_forward(strategy, GRID, train_bars=500, test_bars=250, max_workers=2)
+    pd.testing.assert_frame_equal(serial['windows'], pooled['windows'])
+
+
+def test_monte_carlo_is_reproducible_for_a_seed(strategy):
+    serial = monte_carlo(strategy, PARAMS, n_paths=200, seed=7, batch_size=50, max_workers=1)
+    pooled = monte_carlo(strategy, PARAMS, n_paths=200, seed=7, batch_size=50, max_workers=2)
+    pd.testing.assert_frame_equal(serial['simulations'], pooled['simulations'])
+    other = monte_carlo(strategy, PARAMS, n_paths=200, seed=8, batch_size=50, max_workers=1)
+    assert not serial['simulations'].equals(other['simulations'])
+    assert len(serial['simulations']) == 200
+
+
+def test_whole_series_block_reproduces_the_backtest(strategy):
+    result = monte_carlo(strategy, PARAMS, n_paths=5, block_size=len(strategy.data), seed=0, max_workers=1)
+    for key in ('total_return', 'sharpe_ratio', 'max_drawdown'):
+        assert result['simulations'][key].to_numpy() == pytest.approx(result['observed'][key])
+
+
+def test_path_metrics_match_equity_metrics():
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0, 0.01, size=(3, 300))
+    result = path_metrics(returns, years=metrics.span_years(301, None, 252))
+    for row in range(3):
+        equity = np.concatenate(([1.0], np.cumprod(1 + returns[row])))
+        expected = metrics.equity_metrics(equity)
+        for key, values in result.items():
+            assert values[row] == pytest.approx(expected[key]), key
+
+
+def test_resample_paths_keeps_blocks_together():
+    returns = np.arange(100, dtype=np.float64)
+    paths = resample_paths(returns, 20, block_size=10, rng=np.random.default_rng(0))
+    assert paths.shape == (20, 100)
+    blocks = paths.reshape(20, 10, 10)
+    assert (np.diff(blocks, axis=2) == 1).all()
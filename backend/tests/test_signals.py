@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from trading_engine.signals import signal_positions, signal_to_trades
+from trading_engine.strategy import TradingStrategy
+
+PARAMS = [
+    {'ma_window': 50, 'rsi_oversold': 48, 'rsi_overbought': 52},
+    {'rsi_oversold': 45, 'rsi_overbought': 55},
+    {'ma_window': 5, 'rsi_window': 3, 'rsi_oversold': 30, 'rsi_overbought': 70}
+]
+
+
+def _loop(buy, sell, position=0):
+    """The if/elif state machine of TradingStrategy._generate_trades_loop on plain masks"""
+    trades = []
+    for i in range(len(buy)):
+        if buy[i] and position <= 0:
+            position = 1
+            trades.append((i, 1))
+        elif sell[i] and position >= 0:
+            position = -1
+            trades.append((i, -1))
+    return trades
+
+
+@pytest.mark.parametrize('params', PARAMS)
+def test_vectorized_trades_match_loop(store, params):
+    strategy = TradingStrategy('SYN', '2015-01-01', '2020-01-01', store=store)
+    strategy.fetch_data()
+    strategy.calculate_moving_average(params.get('ma_window', 20))
+    strategy.calculate_rsi(params.get('rsi_window', 14))
+
+    vectorized = strategy._generate_trades(params['rsi_overbought'], params['rsi_oversold'])
+    loop = strategy._generate_trades_loop(params['rsi_overbought'], params['rsi_oversold'])
+    assert len(loop) > 0
+    assert vectorized == loop
+
+
+def test_backtest_modes_agree(store):
+    params = PARAMS[1]
+    vectorized = TradingStrategy('SYN', '2015-01-01', '2020-01-01', store=store).backtest(params)
+    loop = TradingStrategy('SYN', '2015-01-01', '2020-01-01', store=store).backtest(params, vectorized=False)
+    assert vectorized == loop
+
+
+@pytest.mark.parametrize('position', [-1, 0, 1])
+@pytest.mark.parametrize('seed', range(20))
+def test_signal_to_trades_matches_loop(seed, position):
+    rng = np.random.default_rng(seed)
+    # Masks overlap on some bars, as compiled plans can
+    buy = rng.random(200) < 0.2
+    sell = rng.random(200) < 0.2
+    idx, positions = signal_to_trades(buy, sell, position)
+    assert list(zip(idx.tolist(), positions.tolist())) == _loop(buy, sell, position)
+
+
+def test_bars_with_both_signals_flip_the_position():
+    buy = [0, 1, 1, 1, 1]
+    sell = [0, 0, 1, 0, 1]
+    idx, positions = signal_to_trades(buy, sell)
+    assert list(zip(idx.tolist(), positions.tolist())) == [(1, 1), (2, -1), (3, 1), (4, -1)]
+    assert signal_positions(buy, sell).tolist() == [0, 1, -1, 1, -1]
+    assert signal_to_trades([1, 1], [1, 1])[1].tolist() == [1, -1]
+
+
+def test_signal_positions_matches_trades():
+    rng = np.random.default_rng(0)
+    buy = rng.random((300, 4)) < 0.2
+    sell = rng.random((300, 4)) < 0.2
+    positions = signal_positions(buy, sell)
+    for column in range(4):
+        expected = np.zeros(300, dtype=int)
+        for i, position in _loop(buy[:, column], sell[:, column]):
+            expected[i:] = position
+        assert positions[:, column].tolist() == expected.tolist()
@@ -0,0 +1,23 @@
+import pytest
+
+from trading_engine.strategy import TradingStrategy
+
+PARAMS = {'ma_window': 50, 'rsi_oversold': 48, 'rsi_overbought': 52}
+
+
+@pytest.mark.parametrize('interval, start, end', [
+    ('1d', '2010-01-01', '2020-01-01'),
+    ('1h', '2020-01-01', '2020-03-01')
+])
+def test_chunked_backtest_matches_in_memory(store, interval, start, end):
+    in_memory = TradingStrategy('SYN', start, end, store=store)
+    in_memory.data = store.history('SYN', start, end, interval=interval)
+    expected = in_memory.backtest(PARAMS)
+
+    chunked = TradingStrategy('SYN', start, end, store=store)
+    result = chunked.backtest_chunked(PARAMS, chunk_size=97, interval=interval)
+    assert len(expected['trades']) > 10
+    assert result['trades'] == expected['trades']
+    assert result.keys() == expected.keys()
+    for key in result.keys() - {'trades'}:
+        assert result[key] == pytest.approx(expected[key]), key
@@ -0,0 +1,29 @@
+import app as application
+
+
+def test_stream_rejects_too_many_symbols(client):
+    symbols = ','.join('S{}'.format(i) for i in range(application.STREAM_MAX_SYMBOLS + 1))
+    response = client.get('/api/stream?symbols=' + symbols)
+    assert response.status_code == 400
+    assert application.get_price_stream().stats()['pollers'] == 0
+
+
+def test_stream_subscribes_until_the_response_is_closed(client):
+    price_stream = application.get_price_stream()
+    response = client.get('/api/stream?symbols=aaa,bbb,aaa')
+    assert response.status_code == 200
+    first = next(iter(response.response))
+    assert first.startswith(b'event: snapshot')
+    assert price_stream.stats()['subscribers'] == 1
+    assert price_stream.stats()['pollers'] == 2
+
+    response.close()
+    assert price_stream.stats()['subscribers'] == 0
+    assert price_stream.stats()['pollers'] == 0
+
+
+def test_stream_response_that_is_never_read_does_not_subscribe(client):
+    with application.app.test_request_context('/api/stream?symbols=AAA'):
+        response = application.stream_prices()
+    assert response.status_code == 200
+    assert application.get_price_stream().stats()['pollers'] == 0
@@ -0,0 +1,132 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+# Query names of the bar columns a client can ask for
+FIELDS = {'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'}
+DEFAULT_FIELDS = ('close', 'volume')
+
+MIMETYPES = {
+    'json': 'application/json',
+    'columnar': 'application/vnd.tinkquest.columnar+json',
+    'binary': 'application/octet-stream',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised when a response format cannot be produced, e.g. Arrow without pyarrow"""
+
+
+def negotiate(accept_mimetypes, requested=None):
+    """Pick the response format from a ?format= value or the Accept header.
+
+    accept_mimetypes is a werkzeug MIMEAccept (request.accept_mimetypes).
+    Plain JSON comes first, so */* and missing headers keep the original
+    list-based payload.
+    """
+    if requested:
+        if requested not in MIMETYPES:
+            raise UnsupportedFormatError(
+                'format must be one of: {}'.format(', '.join(MIMETYPES))
+            )
+        return requested
+    if accept_mimetypes is None:
+        return 'json'
+    best = accept_mimetypes.best_match(list(MIMETYPES.values()), default=MIMETYPES['json'])
+    return next(name for name, mimetype in MIMETYPES.items() if mimetype == best)
+
+
+def parse_fields(text):
+    """Comma-separated field names from a ?fields= value"""
+    if not text:
+        return list(DEFAULT_FIELDS)
+    fields = [f.strip().lower() for f in text.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        raise ValueError('Unknown fields: {}'.format(', '.join(unknown)))
+    return list(dict.fromkeys(fields))
+
+
+def epoch_millis(index):
+    """UTC epoch milliseconds for a DatetimeIndex as int64"""
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    return index.tz_convert('UTC').values.astype('datetime64[ms]').view(np.int64)
+
+
+def _json_list(values):
+    # NaN is not valid JSON, so gaps become null
+    if values.dtype.kind == 'f':
+        missing = np.isnan(values)
+        if missing.any():
+            return np.where(missing, None, values).tolist()
+    return values.tolist()
+
+
+def _dumps(document):
+    """JSON-encode a dict of scalars and NumPy arrays, using orjson when it is installed"""
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+    if orjson is not None:
+        return orjson.dumps(document, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps({
+        k: _json_list(v) if isinstance(v, np.ndarray) else v for k, v in document.items()
+    }, separators=(',', ':'))
+
+
+def encode(data, fmt, fields, meta):
+    """Encode OHLCV bars as columns.
+
+    Returns (body, mimetype, headers). Timestamps are UTC epoch
+    milliseconds; prices and volume are float64.
+    """
+    timestamps = np.ascontiguousarray(epoch_millis(data.index))
+    # Bars from the store are strided views of an np.memmap; orjson only
+    # takes plain contiguous arrays
+    columns = {f: np.ascontiguousarray(data[FIELDS[f]].to_numpy(dtype=np.float64)) for f in fields}
+
+    if fmt == 'columnar':
+        document = dict(meta, count=len(timestamps), timestamps=timestamps, **columns)
+        return _dumps(document), MIMETYPES[fmt], {}
+
+    if fmt == 'binary':
+        # One little-endian column after another, all 8-byte aligned:
+        # int64 timestamps, then a float64 array per field
+        body = b''.join(
+            [timestamps.astype('<i8').tobytes()] + [columns[f].astype('<f8').tobytes() for f in fields]
+        )
+        headers = {
+            'X-Rows': str(len(timestamps)),
+            'X-Columns': ','.join(['timestamp:int64'] + ['{}:float64'.format(f) for f in fields])
+        }
+        headers.update({'X-' + k.capitalize(): str(v) for k, v in meta.items()})
+        return body, MIMETYPES[fmt], headers
+
+    if fmt == 'arrow':
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise UnsupportedFormatError('Arrow responses need pyarrow installed')
+        table = pa.table(
+            dict({'timestamp': pa.array(timestamps, type=pa.timestamp('ms', tz='UTC'))}, **columns),
+            metadata={k: str(v) for k, v in meta.items()}
+        )
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes(), MIMETYPES[fmt], {}
+
+    raise UnsupportedFormatError('Unknown format: {}'.format(fmt))
+
+
+def parse_time(value):
+    """A UTC timestamp from an ISO date/time or epoch seconds"""
+    text = str(value).strip()
+    if text.lstrip('-').isdigit():
+        return pd.Timestamp(int(text), unit='s', tz='UTC')
+    ts = pd.Timestamp(text)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
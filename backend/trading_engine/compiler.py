@@ -0,0 +1,191 @@
+import numpy as np
+
+from trading_engine import indicators
+from trading_engine.cache import TTLCache
+
+INDICATORS = ('sma', 'ema', 'rsi')
+CONDITIONS = ('price_above', 'price_below', 'indicator_above', 'indicator_below', 'cross_above', 'cross_below')
+BLOCK_TYPES = ('indicator', 'condition', 'action')
+ACTIONS = ('buy', 'sell')
+
+
+def _kind(block):
+    """Block kind from its id, e.g. 'sma-1712345678' -> 'sma'"""
+    return str(block.get('id', '')).split('-')[0]
+
+
+def _number(value, name):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError('{} must be a number, got {!r}'.format(name, value))
+
+
+class CompiledStrategy:
+    """A Strategy Builder graph lowered to a DAG of array expressions.
+
+    Nodes are keyed by their structure, so the same expression used by
+    several blocks (e.g. SMA(20) in two conditions) is a single node and is
+    computed once per evaluation.
+    """
+
+    def __init__(self, nodes, buy, sell):
+        self.nodes = nodes
+        self.buy = buy
+        self.sell = sell
+
+    def evaluate(self, data):
+        """Return the buy and sell masks for an OHLCV DataFrame"""
+        close = data['Close']
+        values = {}
+        for key in self.nodes:
+            op, args = key[0], key[1:]
+            if op == 'close':
+                values[key] = close.to_numpy(dtype=float)
+            elif op == 'const':
+                values[key] = args[0]
+            elif op == 'sma':
+                values[key] = indicators.sma(close, args[0]).to_numpy()
+            elif op == 'ema':
+                values[key] = close.ewm(span=args[0], adjust=False).mean().to_numpy()
+            elif op == 'rsi':
+                values[key] = indicators.rsi(close, args[0]).to_numpy()
+            elif op in ('gt', 'lt', 'cross_above', 'cross_below'):
+                a, b = (np.broadcast_to(values[arg], close.shape) for arg in args)
+                with np.errstate(invalid='ignore'):
+                    result = a > b if op in ('gt', 'cross_above') else a < b
+                    if op.startswith('cross'):
+                        # Crossed on this bar: the opposite held on the previous one
+                        before = np.zeros(len(result), dtype=bool)
+                        if op == 'cross_above':
+                            before[1:] = a[:-1] <= b[:-1]
+                        else:
+                            before[1:] = a[:-1] >= b[:-1]
+                        result = result & before
+                values[key] = result
+            elif op == 'and':
+                values[key] = np.logical_and.reduce([values[arg] for arg in args])
+            elif op == 'or':
+                values[key] = np.logical_or.reduce([values[arg] for arg in args])
+            elif op == 'false':
+                values[key] = np.zeros(len(close), dtype=bool)
+
+        buy = np.array(values[self.buy], dtype=bool)
+        sell = np.array(values[self.sell], dtype=bool)
+        # The first bar never trades
+        buy[:1] = False
+        sell[:1] = False
+        return buy, sell
+
+
+class _Builder:
+    def __init__(self):
+        self.nodes = {}
+
+    def add(self, *key):
+        # Structurally identical expressions share one node
+        self.nodes.setdefault(key, None)
+        return key
+
+
+def _combine(builder, op, terms):
+    # Both operators are commutative, so order the terms to share the node
+    terms = sorted(set(terms), key=repr)
+    return terms[0] if len(terms) == 1 else builder.add(op, *terms)
+
+
+def compile_strategy(strategy):
+    """Compile a saved strategy's ordered blocks into a CompiledStrategy.
+
+    Conditions since the previous action are ANDed together to trigger the
+    next action; several buy (or sell) actions are ORed.
+    """
+    blocks = strategy.get('blocks') or []
+    builder = _Builder()
+    close = builder.add('close')
+
+    indicator_nodes = {}
+    for block in blocks:
+        kind = _kind(block)
+        if block.get('type') not in BLOCK_TYPES:
+            raise ValueError('Unknown block type {!r} for block {}'.format(block.get('type'), block.get('id')))
+        if block.get('type') == 'indicator':
+            if kind not in INDICATORS:
+                raise ValueError('Unknown indicator block: {}'.format(block.get('id')))
+            period = int(_number(block.get('params', {}).get('period'), 'period'))
+            if period <= 0:
+                raise ValueError('{} period must be greater than 0'.format(block.get('name', kind)))
+            indicator_nodes[block['id']] = builder.add(kind, period)
+
+    block_ids = {block.get('id') for block in blocks}
+
+    def operand(value, name):
+        # Conditions may point at an indicator block or give a constant.
+        # Only indicators are inputs, so the graph cannot contain a cycle.
+        if value in indicator_nodes:
+            return indicator_nodes[value]
+        if value in block_ids:
+            raise ValueError('{} must refer to an indicator block, got {}'.format(name, value))
+        return builder.add('const', _number(value, name))
+
+    def indicator(value, name):
+        if value not in indicator_nodes:
+            raise ValueError('{} must refer to an indicator block, got {}'.format(name, value))
+        return indicator_nodes[value]
+
+    triggers = {'buy': [], 'sell': []}
+    pending = []
+    for block in blocks:
+        kind = _kind(block)
+        params = block.get('params', {})
+        if block.get('type') == 'condition':
+            if kind not in CONDITIONS:
+                raise ValueError('Unknown condition block: {}'.format(block.get('id')))
+            op = 'gt' if kind.endswith('above') else 'lt'
+            if kind in ('price_above', 'price_below'):
+                # An indicator, when selected, replaces the constant value
+                threshold = params.get('indicator') or params.get('value')
+                pending.append(builder.add(op, close, operand(threshold, 'value')))
+            elif kind in ('indicator_above', 'indicator_below'):
+                if not params.get('indicator1'):
+                    raise ValueError('{} requires an indicator to be selected'.format(block.get('name', kind)))
+                first = indicator(params.get('indicator1'), 'indicator1')
+                pending.append(builder.add(op, first, operand(params.get('value'), 'value')))
+            else:
+                if not params.get('indicator1') or not params.get('indicator2'):
+                    raise ValueError('{} requires two indicators to be selected'.format(block.get('name', kind)))
+                first = indicator(params.get('indicator1'), 'indicator1')
+                second = indicator(params.get('indicator2'), 'indicator2')
+                pending.append(builder.add(kind, first, second))
+        elif block.get('type') == 'action':
+            if kind not in ACTIONS:
+                raise ValueError('Unknown action block: {}'.format(block.get('id')))
+            if not pending:
+                raise ValueError('Actions must follow conditions')
+            condition = _combine(builder, 'and', pending)
+            triggers[kind].append(condition)
+            pending = []
+
+    outputs = []
+    for side in ('buy', 'sell'):
+        if triggers[side]:
+            outputs.append(_combine(builder, 'or', triggers[side]))
+        else:
+            outputs.append(builder.add('false'))
+
+    # Keys are inserted after their inputs, so insertion order is topological
+    return CompiledStrategy(list(builder.nodes), outputs[0], outputs[1])
+
+
+_plan_cache = TTLCache(maxsize=256, ttl=float('inf'))
+
+
+def get_compiled_strategy(strategy):
+    """Compile a saved strategy, reusing the plan while it is unmodified"""
+    key = (strategy.get('id'), strategy.get('lastModified'))
+    plan = _plan_cache.get(key) if key[0] is not None else None
+    if plan is None:
+        plan = compile_strategy(strategy)
+        if key[0] is not None:
+            _plan_cache.set(key, plan)
+    return plan
@@ -0,0 +1,452 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from trading_engine.instrumentation import stage
+
+try:
+    import fcntl
+except ImportError:  # Windows: refreshes are only serialized within a process
+    fcntl = None
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+DEFAULT_STORE_DIR = os.environ.get(
+    'BAR_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'bars')
+)
+
+# Seconds a fetch of the still-open tail of a range (bars since today's
+# midnight) is served before the provider is asked again
+DEFAULT_TAIL_TTL = float(os.environ.get('BAR_STORE_TAIL_TTL', 60))
+
+# Rows copied at a time when stored bars are rewritten into a new version
+COPY_CHUNK = 1 << 20
+
+
+@contextmanager
+def _locked(path):
+    """Hold an exclusive lock on path that every process using the store respects"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        # Closing the file releases the lock
+        yield
+
+
+def _to_utc(value):
+    """Convert a date, string or datetime into a UTC timestamp"""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        return ts.tz_localize('UTC')
+    return ts.tz_convert('UTC')
+
+
+class YFinanceProvider:
+    """Fetch bars from Yahoo Finance"""
+
+    def history(self, symbol, start, end, interval='1d'):
+        import yfinance as yf
+        return yf.Ticker(symbol).history(start=start, end=end, interval=interval)
+
+
+class CSVProvider:
+    """Serve bars from <directory>/<SYMBOL>.csv files, e.g. test fixtures"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def history(self, symbol, start, end, interval='1d'):
+        path = os.path.join(self.directory, '{}.csv'.format(symbol))
+        data = pd.read_csv(path, index_col=0)
+        data.index = pd.to_datetime(data.index, utc=True)
+        return data[(data.index >= start) & (data.index < end)]
+
+
+def _uniform(stamps, key, stream):
+    """Counter-based (splitmix64) uniform noise in [0, 1) for each timestamp"""
+    with np.errstate(over='ignore'):
+        z = stamps.view(np.uint64) ^ np.uint64(key) ^ np.uint64(stream * 0xD1B54A32D192ED03 % 2 ** 64)
+        z = z + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)) * (1.0 / 2 ** 53)
+
+
+def synthetic_bars(index, symbol='SYN', seed=0):
+    """Deterministic OHLCV bars at the given timestamps, without network access.
+
+    Prices are a sum of slow cycles plus per-bar noise that depends only on
+    (seed, symbol, timestamp), so the same bar always has the same values
+    however the range around it is requested.
+    """
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    stamps = index.tz_convert('UTC').values.astype('datetime64[ns]').view(np.int64)
+    key = zlib.crc32('{}:{}'.format(seed, symbol).encode())
+    rng = np.random.default_rng(key)
+    periods = rng.uniform([3, 15, 60, 250, 1000], [8, 45, 180, 700, 2500])
+    amplitudes = rng.uniform(0.02, 0.15, 5) * np.sqrt(periods / periods[-1])
+    phases = rng.uniform(0, 2 * math.pi, 5)
+    base = math.log(rng.uniform(20, 400))
+
+    days = stamps / 86400e9
+    log_close = np.full(len(stamps), base)
+    for period, amplitude, phase in zip(periods, amplitudes, phases):
+        log_close += amplitude * np.sin(2 * math.pi * days / period + phase)
+    log_close += 0.01 * (_uniform(stamps, key, 1) - 0.5)
+
+    close = np.exp(log_close)
+    open_ = close * (1 + 0.01 * (_uniform(stamps, key, 2) - 0.5))
+    high = np.maximum(open_, close) * (1 + 0.005 * _uniform(stamps, key, 3))
+    low = np.minimum(open_, close) * (1 - 0.005 * _uniform(stamps, key, 4))
+    volume = np.floor(1e5 * (0.5 + _uniform(stamps, key, 5)))
+    return pd.DataFrame(
+        {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index
+    )
+
+
+class SyntheticProvider:
+    """Deterministic generated bars for offline runs, load tests and benchmarks"""
+
+    FREQUENCIES = {'1m': 'min', '5m': '5min', '15m': '15min', '30m': '30min', '1h': 'h', '1d': 'D'}
+
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    def history(self, symbol, start, end, interval='1d'):
+        freq = self.FREQUENCIES.get(interval)
+        if freq is None:
+            raise ValueError('Unsupported interval: {}'.format(interval))
+        end = _to_utc(end)
+        index = pd.date_range(_to_utc(start).ceil(freq), end, freq=freq)
+        index = index[index < end]
+        if freq == 'D':
+            # Trading days only
+            index = index[index.dayofweek < 5]
+        return synthetic_bars(index, symbol, self.seed)
+
+
+class BarStore:
+    """On-disk per-symbol OHLCV store in front of a market data provider.
+
+    Each (interval, symbol) pair is kept as memory-mapped NumPy arrays plus
+    the [start, end) range already fetched. Requests are served from local
+    data and only the missing head/tail of the range is fetched.
+
+    The files are shared by every worker process: frames are views of the
+    read-only memory maps, so all workers read the same page-cache pages,
+    and a file lock makes sure only one process fetches a missing range.
+    """
+
+    ARRAY_FILE = re.compile(r'^(index|ohlcv)(-\d+)?\.npy$')
+
+    def __init__(self, root=DEFAULT_STORE_DIR, provider=None, tail_ttl=DEFAULT_TAIL_TTL):
+        self.root = root
+        self.provider = provider or YFinanceProvider()
+        self.tail_ttl = tail_ttl
+        self.hits = 0
+        self.misses = 0
+        self.provider_calls = 0
+        # Guards the counters and the lock table; each (interval, symbol)
+        # has its own lock so fetches of different symbols run in parallel
+        self._lock = threading.Lock()
+        self._symbol_locks = {}
+        # path -> (version, index, values) of the arrays mapped by this process
+        self._maps = {}
+
+    def _path(self, symbol, interval):
+        return os.path.join(self.root, interval, symbol.upper())
+
+    def _symbol_lock(self, symbol, interval):
+        key = (interval, symbol.upper())
+        with self._lock:
+            lock = self._symbol_locks.get(key)
+            if lock is None:
+                lock = self._symbol_locks[key] = threading.RLock()
+            return lock
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    @staticmethod
+    def _array_path(path, name, version):
+        # Stores written before arrays were versioned have no suffix
+        return os.path.join(path, '{}-{}.npy'.format(name, version) if version else name + '.npy')
+
+    def _load(self, symbol, interval, retry=True):
+        path = self._path(symbol, interval)
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None, None, None
+        version = meta.get('version')
+        mapped = self._maps.get(path)
+        if mapped is not None and mapped[0] == version:
+            return meta, mapped[1], mapped[2]
+        try:
+            index = np.load(self._array_path(path, 'index', version), mmap_mode='r')
+            values = np.load(self._array_path(path, 'ohlcv', version), mmap_mode='r')
+        except FileNotFoundError:
+            # Another process saved a newer version between reading meta.json
+            # and the arrays, and pruned this one
+            if not retry:
+                raise
+            return self._load(symbol, interval, retry=False)
+        self._maps[path] = (version, index, values)
+        return meta, index, values
+
+    def _save(self, symbol, interval, meta, parts):
+        """Write the (index, values) array pairs in parts, one after another, as a new version"""
+        path = self._path(symbol, interval)
+        os.makedirs(path, exist_ok=True)
+        # Each version gets new array files and meta.json is replaced last, so
+        # readers see either the old or the new version, never a mix, and
+        # arrays other processes have mapped are never overwritten
+        version = meta['version']
+        rows = sum(len(index) for index, _ in parts)
+        targets = [self._array_path(path, name, version) for name in ('index', 'ohlcv')]
+        index_out = np.lib.format.open_memmap(targets[0] + '.tmp', mode='w+', dtype=np.int64, shape=(rows,))
+        values_out = np.lib.format.open_memmap(
+            targets[1] + '.tmp', mode='w+', dtype=np.float64, shape=(rows, len(COLUMNS))
+        )
+        # Parts may be memory-mapped stored bars: copy them a chunk at a time
+        # so the history is never loaded whole
+        row = 0
+        for index, values in parts:
+            for i in range(0, len(index), COPY_CHUNK):
+                j = min(i + COPY_CHUNK, len(index))
+                index_out[row + i:row + j] = index[i:j]
+                values_out[row + i:row + j] = values[i:j]
+            row += len(index)
+        index_out.flush()
+        values_out.flush()
+        del index_out, values_out
+        for target in targets:
+            os.replace(target + '.tmp', target)
+        self._save_meta(path, meta)
+
+        # Keep the previous version for readers that have just read the old meta.json
+        keep = {os.path.basename(self._array_path(path, name, v))
+                for name in ('index', 'ohlcv') for v in (version, version - 1)}
+        for name in os.listdir(path):
+            if self.ARRAY_FILE.match(name) and name not in keep:
+                try:
+                    os.remove(os.path.join(path, name))
+                except OSError:
+                    # Still mapped somewhere on a platform that forbids removing it
+                    pass
+
+    @staticmethod
+    def _save_meta(path, meta):
+        tmp = os.path.join(path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(path, 'meta.json'))
+
+    def _fetch(self, symbol, start, end, interval):
+        self._count('provider_calls')
+        with stage('bar_store.fetch'):
+            data = self.provider.history(symbol, start=start, end=end, interval=interval)
+        if data is None or data.empty:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(COLUMNS))), None
+        index = data.index
+        tz = str(index.tz) if index.tz is not None else None
+        if index.tz is None:
+            index = index.tz_localize('UTC')
+        stamps = index.tz_convert('UTC').values.astype('datetime64[ns]').view(np.int64)
+        values = data[COLUMNS].to_numpy(dtype=np.float64)
+        return stamps, values, tz
+
+    def _gaps(self, meta, start, end):
+        """The parts of [start, end) that are not stored yet"""
+        if meta is None:
+            return [(start, end)]
+        gaps = []
+        covered_start = pd.Timestamp(meta['start'])
+        covered_end = pd.Timestamp(meta['end'])
+        if start < covered_start:
+            gaps.append((start, covered_start))
+        if end > covered_end and not self._tail_fresh(meta, end):
+            gaps.append((covered_end, end))
+        return gaps
+
+    def _tail_fresh(self, meta, end):
+        """Whether the tail up to end was fetched less than tail_ttl seconds ago.
+
+        Coverage never includes today's still-changing bars, so a range
+        ending now always has a tail gap; the last fetch of that tail is
+        served until it is tail_ttl seconds old, and only ranges ending
+        within tail_ttl seconds of the fetched end count.
+        """
+        if 'fetched_at' not in meta or time.time() - meta['fetched_at'] >= self.tail_ttl:
+            return False
+        return end <= pd.Timestamp(meta['fetched_end']) + pd.Timedelta(seconds=self.tail_ttl)
+
+    def _ensure(self, symbol, start, end, interval):
+        """Make sure [start, end) is stored locally and return the stored arrays"""
+        meta, index, values = self._load(symbol, interval)
+        if self._gaps(meta, start, end):
+            # Another process may be fetching the same bars: wait for it,
+            # then only fetch what is still missing
+            with _locked(self._path(symbol, interval) + '.lock'):
+                meta, index, values = self._load(symbol, interval)
+                gaps = self._gaps(meta, start, end)
+                if gaps:
+                    self._count('misses')
+                    self._refresh(symbol, interval, meta, index, values, gaps)
+                    meta, index, values = self._load(symbol, interval)
+                    if meta is None:
+                        # Nothing fetched and nothing stored yet
+                        return {}, np.empty(0, dtype=np.int64), np.empty((0, len(COLUMNS)))
+                    return meta, index, values
+        self._count('hits')
+        return meta, index, values
+
+    def _frame(self, meta, index, values):
+        dates = pd.DatetimeIndex(index.view('datetime64[ns]'), tz='UTC')
+        if meta.get('tz'):
+            dates = dates.tz_convert(meta['tz'])
+        # The OHLCV values stay a view of the read-only memory map
+        return pd.DataFrame(values, index=dates, columns=COLUMNS, copy=False)
+
+    def history(self, symbol, start, end, interval='1d'):
+        """Return OHLCV bars for symbol in [start, end) as a DataFrame.
+
+        The bar values are shared with the on-disk store and read-only;
+        adding or replacing columns is fine, but copy() the frame before
+        changing values in place.
+        """
+        start = _to_utc(start)
+        end = _to_utc(end)
+        with self._symbol_lock(symbol, interval):
+            meta, index, values = self._ensure(symbol, start, end, interval)
+            lo = np.searchsorted(index, start.value, side='left')
+            hi = np.searchsorted(index, end.value, side='left')
+            return self._frame(meta, index[lo:hi], values[lo:hi])
+
+    def iter_chunks(self, symbol, start, end, chunk_size=100000, interval='1d'):
+        """Yield bars in [start, end) as DataFrames of at most chunk_size rows.
+
+        Chunks are sliced from the memory-mapped arrays, so only one chunk
+        is held in memory at a time.
+        """
+        start = _to_utc(start)
+        end = _to_utc(end)
+        with self._symbol_lock(symbol, interval):
+            meta, index, values = self._ensure(symbol, start, end, interval)
+            lo = np.searchsorted(index, start.value, side='left')
+            hi = np.searchsorted(index, end.value, side='left')
+        for i in range(lo, hi, chunk_size):
+            j = min(i + chunk_size, hi)
+            yield self._frame(meta, index[i:j], values[i:j])
+
+    def _refresh(self, symbol, interval, meta, index, values, gaps):
+        """Fetch the missing ranges and write them around the stored bars.
+
+        Gaps are only ever before or after the stored range, so the new
+        version is the fetched head, the stored bars and the fetched tail,
+        and the stored bars are copied from the memory map rather than
+        loaded into memory.
+        """
+        tz = meta.get('tz') if meta else None
+        parts_index = []
+        parts_values = []
+        # Stored bars index[lo:hi] are kept; fetched bars replace any they overlap
+        lo, hi = 0, 0 if index is None else len(index)
+        # Today's bars are still changing: the last gap is the open tail
+        # when it starts where the stored bars end and runs past midnight
+        today = pd.Timestamp.now(tz='UTC').normalize()
+        tail = gaps[-1]
+        if tail[1] <= today or (meta is not None and tail[0] != pd.Timestamp(meta['end'])):
+            tail = None
+        fetched_at = time.time()
+        covered = []
+        for gap_start, gap_end in gaps:
+            stamps, fetched, fetched_tz = self._fetch(symbol, gap_start, gap_end, interval)
+            if not len(stamps):
+                # A closed range without bars next to stored ones is a
+                # weekend or holiday. With nothing stored yet it may be a
+                # provider failure, and the open tail is asked for again
+                # once tail_ttl has passed
+                if meta is not None and gap_end <= today:
+                    covered.append((gap_start, gap_end))
+                continue
+            covered.append((gap_start, gap_end))
+            parts_index.append(stamps)
+            parts_values.append(fetched)
+            tz = tz or fetched_tz
+            if index is None:
+                continue
+            if gap_end == pd.Timestamp(meta['start']):
+                lo = np.searchsorted(index, stamps.max(), side='right')
+            else:
+                hi = np.searchsorted(index, stamps.min(), side='left')
+        tail_fetch = {'fetched_at': fetched_at, 'fetched_end': tail[1].isoformat()} if tail else {}
+        if not covered and not (meta and tail_fetch):
+            return
+
+        # Never mark today's bars as covered
+        starts = [g[0] for g in covered] + ([pd.Timestamp(meta['start'])] if meta else [])
+        ends = [g[1] for g in covered] + ([pd.Timestamp(meta['end'])] if meta else [])
+        covered_start = min(starts)
+        covered_end = max(min(max(ends), today), covered_start)
+        meta = dict(meta or {}, start=covered_start.isoformat(), end=covered_end.isoformat(), tz=tz, **tail_fetch)
+        if not parts_index:
+            # No new bars: only the covered range or the tail's fetch time
+            # changed, and the stored arrays stay as they are
+            self._save_meta(self._path(symbol, interval), meta)
+            return
+        meta['version'] = (meta.get('version') or 0) + 1
+
+        fetched_index = np.concatenate(parts_index)
+        fetched_values = np.concatenate(parts_values)
+        # Keep the most recently fetched bar when timestamps overlap
+        order = np.argsort(fetched_index, kind='stable')[::-1]
+        fetched_index, first = np.unique(fetched_index[order], return_index=True)
+        fetched_values = fetched_values[order][first]
+        if lo < hi:
+            split = np.searchsorted(fetched_index, index[lo])
+            parts = [
+                (fetched_index[:split], fetched_values[:split]),
+                (index[lo:hi], values[lo:hi]),
+                (fetched_index[split:], fetched_values[split:])
+            ]
+        else:
+            parts = [(fetched_index, fetched_values)]
+        self._save(symbol, interval, meta, parts)
+
+    def stats(self):
+        """Return cache hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'provider_calls': self.provider_calls,
+            'hit_ratio': self.hits / total if total else 0
+        }
+
+
+_default_store = None
+
+
+def get_bar_store():
+    """Return the process-wide bar store shared by the API and the engine"""
+    global _default_store
+    if _default_store is None:
+        provider = SyntheticProvider() if os.environ.get('BAR_PROVIDER') == 'synthetic' else None
+        _default_store = BarStore(provider=provider)
+    return _default_store
@@ -0,0 +1,422 @@
+import heapq
+import itertools
+
+import numpy as np
+
+from trading_engine import metrics
+
+ORDER_TYPES = ('market', 'limit', 'stop')
+
+# Events on the same bar run in this order: new signals replace the working
+# order first, then orders try to fill
+SIGNAL, ORDER = 0, 1
+
+# First look this many bars ahead for a bar where a working order can fill
+_SEARCH_WINDOW = 64
+
+
+class Order:
+    """A working order for a signed quantity (positive buys, negative sells)"""
+
+    __slots__ = ('id', 'quantity', 'filled', 'order_type', 'limit_price', 'stop_price',
+                 'submitted', 'expires', 'triggered', 'status')
+
+    def __init__(self, id, quantity, order_type='market', limit_price=None, stop_price=None,
+                 submitted=0, expires=None):
+        if order_type not in ORDER_TYPES:
+            raise ValueError('Unknown order type: {}'.format(order_type))
+        self.id = id
+        self.quantity = quantity
+        self.filled = 0.0
+        self.order_type = order_type
+        self.limit_price = limit_price
+        self.stop_price = stop_price
+        self.submitted = submitted
+        self.expires = expires
+        self.triggered = order_type != 'stop'
+        self.status = 'working'
+
+    @property
+    def remaining(self):
+        return self.quantity - self.filled
+
+
+class FillModel:
+    """When and at what reference price orders fill.
+
+    price is the bar field market orders fill at ('close' or 'open') and
+    delay the number of bars between a signal and its first fill attempt.
+    volume_limit caps each fill at that fraction of the bar's volume, leaving
+    the rest of the order working; None fills in full.
+    """
+
+    def __init__(self, price='close', delay=0, volume_limit=None):
+        if price not in ('close', 'open'):
+            raise ValueError("Fill price must be 'close' or 'open'")
+        self.price = price
+        self.delay = int(delay)
+        self.volume_limit = volume_limit
+
+    def spec(self):
+        return {'price': self.price, 'delay': self.delay, 'volume_limit': self.volume_limit}
+
+
+class CloseFill(FillModel):
+    """Fill in full at the signal bar's close: the plain backtest behaviour"""
+
+    def __init__(self):
+        super().__init__('close', 0, None)
+
+
+class NextOpenFill(FillModel):
+    """Fill at the next bar's open, taking at most volume_limit of each bar's volume"""
+
+    def __init__(self, volume_limit=0.1):
+        super().__init__('open', 1, volume_limit)
+
+
+class Slippage:
+    """Adverse price adjustment for market and stop fills.
+
+    Buys pay and sells give up half the quoted spread plus a fixed
+    slippage, both in basis points, plus market impact that grows linearly
+    with the share of the bar's volume taken.
+    """
+
+    def __init__(self, spread_bps=0.0, slippage_bps=0.0, impact=0.0):
+        self.spread_bps = spread_bps
+        self.slippage_bps = slippage_bps
+        self.impact = impact
+
+    def adjust(self, price, quantity, volume):
+        cost = (self.spread_bps / 2 + self.slippage_bps) / 10000
+        if self.impact and volume > 0:
+            cost += self.impact * abs(quantity) / volume
+        return price * (1 + cost) if quantity > 0 else price * (1 - cost)
+
+    def spec(self):
+        return {'spread_bps': self.spread_bps, 'slippage_bps': self.slippage_bps, 'impact': self.impact}
+
+
+class Commission:
+    """Per-share plus percent-of-notional commission with an optional minimum"""
+
+    def __init__(self, per_share=0.0, percent=0.0, minimum=0.0):
+        self.per_share = per_share
+        self.percent = percent
+        self.minimum = minimum
+
+    def cost(self, quantity, price):
+        fee = abs(quantity) * self.per_share + abs(quantity * price) * self.percent / 100
+        return max(fee, self.minimum) if fee or self.minimum else 0.0
+
+    def spec(self):
+        return {'per_share': self.per_share, 'percent': self.percent, 'minimum': self.minimum}
+
+
+class PercentOfEquity:
+    """Size each position as a fraction of current equity"""
+
+    def __init__(self, fraction=1.0, whole_shares=False):
+        self.fraction = fraction
+        self.whole_shares = whole_shares
+
+    def size(self, equity, price):
+        quantity = max(equity, 0) * self.fraction / price if price > 0 else 0.0
+        return float(np.floor(quantity)) if self.whole_shares else quantity
+
+    def spec(self):
+        return {'sizing': 'percent', 'fraction': self.fraction, 'whole_shares': self.whole_shares}
+
+
+class FixedQuantity:
+    """Trade the same number of shares for every position"""
+
+    def __init__(self, quantity=1):
+        self.quantity = quantity
+
+    def size(self, equity, price):
+        return float(self.quantity)
+
+    def spec(self):
+        return {'sizing': 'fixed', 'quantity': self.quantity}
+
+
+class ExecutionSimulator:
+    """Turn target-position signals into fills with an event-driven loop.
+
+    Signals and orders are events in a priority queue ordered by bar, so
+    the loop only visits bars where something can happen instead of every
+    bar of the history. Each signal cancels the working order and places a
+    new one for the difference between the target and current holdings.
+    Equity is marked to market on every bar afterwards in one vectorized
+    pass. With the defaults (CloseFill, no costs, all equity per position)
+    every signal fills at the same bar and price as the plain backtest,
+    and since both hold a position's share count fixed until the next
+    signal, the metrics match calculate_performance() for shorts as well
+    as longs.
+    """
+
+    def __init__(self, fill=None, slippage=None, commission=None, sizer=None, order_type='market',
+                 offset_bps=0.0, expire_bars=None, initial_capital=100000):
+        if order_type not in ORDER_TYPES:
+            raise ValueError('Unknown order type: {}'.format(order_type))
+        self.fill = fill or CloseFill()
+        self.slippage = slippage or Slippage()
+        self.commission = commission or Commission()
+        self.sizer = sizer or PercentOfEquity()
+        self.order_type = order_type
+        self.offset_bps = offset_bps
+        self.expire_bars = expire_bars
+        self.initial_capital = initial_capital
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a simulator from a JSON config such as a backtest request's 'execution'"""
+        config = dict(config or {})
+        fill = config.pop('fill', 'close')
+        volume_limit = config.pop('volume_limit', None)
+        if fill == 'close':
+            fill_model = CloseFill() if volume_limit is None else FillModel('close', 0, volume_limit)
+        elif fill == 'next_open':
+            fill_model = NextOpenFill(volume_limit)
+        else:
+            raise ValueError("fill must be 'close' or 'next_open'")
+
+        sizing = config.pop('sizing', 'percent')
+        if sizing == 'percent':
+            sizer = PercentOfEquity(float(config.pop('fraction', 1.0)), bool(config.pop('whole_shares', False)))
+        elif sizing == 'fixed':
+            sizer = FixedQuantity(float(config.pop('quantity', 1)))
+        else:
+            raise ValueError("sizing must be 'percent' or 'fixed'")
+
+        slippage = Slippage(*(float(config.pop(k, 0)) for k in ('spread_bps', 'slippage_bps', 'impact')))
+        commission = Commission(*(float(config.pop(k, 0)) for k in ('per_share', 'percent', 'minimum')))
+        expire_bars = config.pop('expire_bars', None)
+        simulator = cls(
+            fill_model, slippage, commission, sizer,
+            order_type=config.pop('order_type', 'market'),
+            offset_bps=float(config.pop('offset_bps', 0)),
+            expire_bars=int(expire_bars) if expire_bars is not None else None,
+            initial_capital=float(config.pop('initial_capital', 100000))
+        )
+        if config:
+            raise ValueError('Unknown execution settings: {}'.format(', '.join(sorted(config))))
+        return simulator
+
+    def spec(self):
+        """Settings that change the result, for cache keys"""
+        return {
+            'fill': self.fill.spec(),
+            'slippage': self.slippage.spec(),
+            'commission': self.commission.spec(),
+            'sizer': self.sizer.spec(),
+            'order_type': self.order_type,
+            'offset_bps': self.offset_bps,
+            'expire_bars': self.expire_bars,
+            'initial_capital': self.initial_capital
+        }
+
+    def run(self, data, trades, periods_per_year=252):
+        """Simulate the trades list of a backtest against OHLCV data"""
+        bars = data.index.get_indexer([t['date'] for t in trades])
+        return self.run_signals(data, bars, [t['position'] for t in trades], periods_per_year)
+
+    def run_signals(self, data, bars, targets, periods_per_year=252):
+        """Simulate target positions (-1, 0 or 1) that take effect at the given bar numbers"""
+        self._open = data['Open'].to_numpy(dtype=np.float64)
+        self._high = data['High'].to_numpy(dtype=np.float64)
+        self._low = data['Low'].to_numpy(dtype=np.float64)
+        self._close = data['Close'].to_numpy(dtype=np.float64)
+        self._volume = data['Volume'].to_numpy(dtype=np.float64)
+        n = len(self._close)
+
+        events = []
+        sequence = itertools.count()
+        for bar, target in zip(bars, targets):
+            heapq.heappush(events, (int(bar), SIGNAL, next(sequence), target))
+
+        cash = float(self.initial_capital)
+        holdings = 0.0
+        working = None
+        fills = []
+        counts = {'submitted': 0, 'filled': 0, 'partial': 0, 'cancelled': 0, 'expired': 0}
+        slippage_cost = 0.0
+        commission_cost = 0.0
+
+        while events:
+            bar, kind, _, payload = heapq.heappop(events)
+            if bar >= n:
+                continue
+
+            if kind == SIGNAL:
+                if working is not None:
+                    working.status = 'cancelled'
+                    counts['cancelled'] += 1
+                    working = None
+                reference = self._close[bar]
+                equity = cash + holdings * reference
+                quantity = payload * self.sizer.size(equity, reference) - holdings
+                if quantity == 0:
+                    continue
+                working = self._order(next(sequence), quantity, reference, bar)
+                counts['submitted'] += 1
+                heapq.heappush(events, (bar + self.fill.delay, ORDER, working.id, working))
+                continue
+
+            order = payload
+            if order.status != 'working':
+                continue
+            if order.expires is not None and bar > order.expires:
+                order.status = 'expired'
+                counts['expired'] += 1
+                working = None
+                continue
+
+            fill = self._try_fill(order, bar)
+            if fill is not None:
+                quantity, price, slipped = fill
+                fee = self.commission.cost(quantity, price)
+                cash -= quantity * price + fee
+                holdings += quantity
+                order.filled += quantity
+                slippage_cost += abs(quantity) * slipped
+                commission_cost += fee
+                fills.append((bar, quantity, price, fee, order.order_type))
+                if abs(order.remaining) <= 1e-9 * abs(order.quantity):
+                    order.status = 'filled'
+                    counts['filled'] += 1
+                    working = None
+                    continue
+                counts['partial'] += 1
+
+            following = self._next_bar(order, bar + 1)
+            if following is None:
+                continue
+            heapq.heappush(events, (following, ORDER, order.id, order))
+
+        result = self._performance(data, fills, periods_per_year)
+        result['fills'] = [
+            {
+                'date': data.index[bar],
+                'type': 'buy' if quantity > 0 else 'sell',
+                'quantity': abs(float(quantity)),
+                'price': float(price),
+                'commission': float(fee),
+                'order_type': order_type
+            }
+            for bar, quantity, price, fee, order_type in fills
+        ]
+        result['orders'] = counts
+        result['costs'] = {'commission': float(commission_cost), 'slippage': float(slippage_cost)}
+        return result
+
+    def _order(self, id, quantity, reference, bar):
+        offset = self.offset_bps / 10000
+        side = 1 if quantity > 0 else -1
+        limit_price = stop_price = None
+        if self.order_type == 'limit':
+            # Buy below / sell above the signal price
+            limit_price = reference * (1 - side * offset)
+        elif self.order_type == 'stop':
+            # Buy on strength / sell on weakness past the signal price
+            stop_price = reference * (1 + side * offset)
+        expires = bar + self.fill.delay + self.expire_bars if self.expire_bars is not None else None
+        return Order(id, quantity, self.order_type, limit_price, stop_price, submitted=bar, expires=expires)
+
+    def _try_fill(self, order, bar):
+        """Fill what the bar allows; return (quantity, price, slippage per share) or None"""
+        buy = order.quantity > 0
+        # The signal bar itself can only trade at its close
+        at_close = bar == order.submitted
+        first = self._close[bar] if at_close or self.fill.price == 'close' else self._open[bar]
+        high = first if at_close else self._high[bar]
+        low = first if at_close else self._low[bar]
+
+        if not order.triggered:
+            stop = order.stop_price
+            if buy and high >= stop:
+                first = max(first, stop)
+            elif not buy and low <= stop:
+                first = min(first, stop)
+            else:
+                return None
+            order.triggered = True
+
+        if order.order_type == 'limit':
+            limit = order.limit_price
+            if buy and low <= limit:
+                base = min(first, limit)
+            elif not buy and high >= limit:
+                base = max(first, limit)
+            else:
+                return None
+        else:
+            base = first
+
+        quantity = order.remaining
+        volume = self._volume[bar]
+        if self.fill.volume_limit is not None:
+            available = max(volume, 0) * self.fill.volume_limit
+            if available <= 0:
+                return None
+            quantity = float(np.clip(quantity, -available, available))
+
+        price = base
+        if order.order_type != 'limit':
+            price = self.slippage.adjust(base, quantity, volume)
+        return quantity, price, abs(price - base)
+
+    def _next_bar(self, order, start):
+        """First bar from start where the working order could fill, or None"""
+        n = len(self._close)
+        if order.expires is not None:
+            n = min(n, order.expires + 1)
+        buy = order.quantity > 0
+        window = _SEARCH_WINDOW
+        while start < n:
+            stop = min(start + window, n)
+            if order.order_type == 'market' or order.triggered and order.order_type != 'limit':
+                mask = self._volume[start:stop] > 0 if self.fill.volume_limit is not None else None
+            elif order.order_type == 'limit':
+                mask = self._low[start:stop] <= order.limit_price if buy else self._high[start:stop] >= order.limit_price
+            else:
+                mask = self._high[start:stop] >= order.stop_price if buy else self._low[start:stop] <= order.stop_price
+            if mask is None:
+                return start
+            hits = np.flatnonzero(mask)
+            if len(hits):
+                return start + int(hits[0])
+            start = stop
+            window *= 2
+        if order.expires is not None and order.expires + 1 < len(self._close):
+            # Wake up once more to record the expiry
+            return order.expires + 1
+        return None
+
+    def _performance(self, data, fills, periods_per_year):
+        close = self._close
+        n = len(close)
+        quantity = np.zeros(n)
+        cash_flow = np.zeros(n)
+        if fills:
+            bars = np.array([f[0] for f in fills])
+            traded = np.array([f[1] for f in fills])
+            prices = np.array([f[2] for f in fills])
+            fees = np.array([f[3] for f in fills])
+            np.add.at(quantity, bars, traded)
+            np.add.at(cash_flow, bars, -(traded * prices) - fees)
+        holdings = np.cumsum(quantity)
+        equity = self.initial_capital + np.cumsum(cash_flow) + holdings * close
+
+        if not fills:
+            result = metrics.empty_metrics()
+        else:
+            result = metrics.equity_metrics(
+                equity, np.sign(holdings), index=data.index, periods_per_year=periods_per_year
+            )
+        result['final_equity'] = float(equity[-1]) if n else float(self.initial_capital)
+        self.equity = equity
+        self.holdings = holdings
+        return result
@@ -0,0 +1,279 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+
+
+# Batch indicators over a full price series, or a dates x symbols panel
+
+def _as_pandas(values):
+    if isinstance(values, (pd.Series, pd.DataFrame)):
+        return values
+    return pd.Series(values)
+
+
+def sma(close, window=20):
+    """Simple moving average of a price series"""
+    return _as_pandas(close).rolling(window=window).mean()
+
+
+def _gains_losses(close):
+    delta = _as_pandas(close).diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    return gain, loss
+
+
+def rsi(close, window=14):
+    """Relative Strength Index using a simple mean of gains and losses"""
+    gain, loss = _gains_losses(close)
+    gain = gain.rolling(window=window).mean()
+    loss = loss.rolling(window=window).mean()
+
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def rsi_wilder(close, window=14):
+    """Relative Strength Index using Wilder's smoothing"""
+    gain, loss = _gains_losses(close)
+    gain = gain.ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    loss = loss.ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """MACD line, signal line and histogram"""
+    close = pd.Series(close)
+    line = close.ewm(span=fast, adjust=False).mean() - close.ewm(span=slow, adjust=False).mean()
+    signal_line = line.ewm(span=signal, adjust=False).mean()
+    return pd.DataFrame({'macd': line, 'signal': signal_line, 'histogram': line - signal_line})
+
+
+def bollinger_bands(close, window=20, num_std=2):
+    """Middle, upper and lower Bollinger Bands"""
+    close = pd.Series(close)
+    middle = close.rolling(window=window).mean()
+    std = close.rolling(window=window).std()
+    return pd.DataFrame({
+        'middle': middle,
+        'upper': middle + num_std * std,
+        'lower': middle - num_std * std
+    })
+
+
+def stochastic(high, low, close, k_window=14, d_window=3):
+    """Stochastic Oscillator %K and %D"""
+    high, low, close = pd.Series(high), pd.Series(low), pd.Series(close)
+    lowest = low.rolling(window=k_window).min()
+    highest = high.rolling(window=k_window).max()
+    k = 100 * (close - lowest) / (highest - lowest)
+    return pd.DataFrame({'k': k, 'd': k.rolling(window=d_window).mean()})
+
+
+# Streaming indicators, updated in constant time per new bar
+
+class _RollingMean:
+    """Mean over the last `window` values, kept as a running sum"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.nonzero = 0
+
+    def update(self, value):
+        self.values.append(value)
+        self.total += value
+        self.nonzero += value != 0
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            self.total -= old
+            self.nonzero -= old != 0
+        if len(self.values) < self.window:
+            return NAN
+        # Avoid reporting rounding residue when the window is all zeros
+        return self.total / self.window if self.nonzero else 0.0
+
+
+class _EMA:
+    """Exponential moving average seeded with the first value"""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, value):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+
+def _rsi_value(gain, loss):
+    if math.isnan(gain) or math.isnan(loss):
+        return NAN
+    if loss == 0:
+        return 100.0 if gain > 0 else NAN
+    return 100 - (100 / (1 + gain / loss))
+
+
+class StreamingIndicator:
+    """Base class for indicators that consume one bar at a time"""
+
+    def update(self, close):
+        raise NotImplementedError
+
+    def update_many(self, close):
+        """Feed a series of closes and return the indicator for every bar"""
+        return np.array([self.update(float(c)) for c in close], dtype=float)
+
+
+class StreamingSMA(StreamingIndicator):
+    def __init__(self, window=20):
+        self._mean = _RollingMean(window)
+
+    def update(self, close):
+        return self._mean.update(close)
+
+
+class StreamingRSI(StreamingIndicator):
+    """RSI with either the simple-mean ('simple') or Wilder ('wilder') smoothing"""
+
+    def __init__(self, window=14, method='simple'):
+        if method not in ('simple', 'wilder'):
+            raise ValueError('Unknown RSI method: {}'.format(method))
+        self.window = window
+        self.method = method
+        self.count = 0
+        self.previous = None
+        if method == 'simple':
+            self._gain = _RollingMean(window)
+            self._loss = _RollingMean(window)
+        else:
+            self._gain = _EMA(1 / window)
+            self._loss = _EMA(1 / window)
+
+    def update(self, close):
+        # The first bar has no change and counts as zero gain and loss
+        delta = 0.0 if self.previous is None else close - self.previous
+        self.previous = close
+        self.count += 1
+        gain = self._gain.update(delta if delta > 0 else 0.0)
+        loss = self._loss.update(-delta if delta < 0 else 0.0)
+        if self.count < self.window:
+            return NAN
+        return _rsi_value(gain, loss)
+
+
+class StreamingMACD(StreamingIndicator):
+    def __init__(self, fast=12, slow=26, signal=9):
+        self._fast = _EMA(2 / (fast + 1))
+        self._slow = _EMA(2 / (slow + 1))
+        self._signal = _EMA(2 / (signal + 1))
+
+    def update(self, close):
+        """Return (macd, signal, histogram) after adding close"""
+        line = self._fast.update(close) - self._slow.update(close)
+        signal_line = self._signal.update(line)
+        return line, signal_line, line - signal_line
+
+    def update_many(self, close):
+        return pd.DataFrame(
+            [self.update(float(c)) for c in close], columns=['macd', 'signal', 'histogram']
+        )
+
+
+class StreamingBollingerBands(StreamingIndicator):
+    """Bollinger Bands using a sliding-window Welford variance"""
+
+    def __init__(self, window=20, num_std=2):
+        self.window = window
+        self.num_std = num_std
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, close):
+        """Return (middle, upper, lower) after adding close"""
+        self.values.append(close)
+        if len(self.values) <= self.window:
+            n = len(self.values)
+            delta = close - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (close - self.mean)
+        else:
+            old = self.values.popleft()
+            mean = self.mean + (close - old) / self.window
+            self.m2 += (close - old) * (close - mean + old - self.mean)
+            self.mean = mean
+        if len(self.values) < self.window:
+            return NAN, NAN, NAN
+        std = math.sqrt(max(self.m2, 0.0) / (self.window - 1))
+        return self.mean, self.mean + self.num_std * std, self.mean - self.num_std * std
+
+    def update_many(self, close):
+        return pd.DataFrame(
+            [self.update(float(c)) for c in close], columns=['middle', 'upper', 'lower']
+        )
+
+
+class _RollingExtreme:
+    """Rolling min or max using a monotonic deque (amortised O(1))"""
+
+    def __init__(self, window, largest):
+        self.window = window
+        self.largest = largest
+        self.count = 0
+        self.items = deque()
+
+    def update(self, value):
+        index = self.count
+        self.count += 1
+        if self.largest:
+            while self.items and self.items[-1][1] <= value:
+                self.items.pop()
+        else:
+            while self.items and self.items[-1][1] >= value:
+                self.items.pop()
+        self.items.append((index, value))
+        if self.items[0][0] <= index - self.window:
+            self.items.popleft()
+        return self.items[0][1] if self.count >= self.window else NAN
+
+
+class StreamingStochastic(StreamingIndicator):
+    def __init__(self, k_window=14, d_window=3):
+        self._lowest = _RollingExtreme(k_window, largest=False)
+        self._highest = _RollingExtreme(k_window, largest=True)
+        self._d = deque(maxlen=d_window)
+        self.d_window = d_window
+
+    def update(self, high, low, close):
+        """Return (%K, %D) after adding a bar"""
+        lowest = self._lowest.update(low)
+        highest = self._highest.update(high)
+        if math.isnan(lowest) or highest == lowest:
+            k = NAN
+        else:
+            k = 100 * (close - lowest) / (highest - lowest)
+
+        # %D is NaN while any %K in its window is NaN, like pandas rolling
+        self._d.append(k)
+        if len(self._d) < self.d_window or any(math.isnan(v) for v in self._d):
+            d = NAN
+        else:
+            d = sum(self._d) / self.d_window
+        return k, d
+
+    def update_many(self, high, low, close):
+        return pd.DataFrame(
+            [self.update(float(h), float(l), float(c)) for h, l, c in zip(high, low, close)],
+            columns=['k', 'd']
+        )
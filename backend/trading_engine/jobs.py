@@ -0,0 +1,215 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from trading_engine.cache import TTLCache
+from trading_engine.instrumentation import REGISTRY, capture, record_stage, stage
+
+
+JOB_SECONDS = REGISTRY.histogram('backtest_job_seconds', 'Backtest job time from submission to result')
+JOBS = REGISTRY.counter('backtest_jobs_total', 'Backtest jobs by outcome')
+
+
+class QueueFullError(Exception):
+    """Raised when too many backtests are already waiting to run"""
+
+
+def to_json_safe(value):
+    """Convert NumPy/pandas values in a result into plain JSON types"""
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(value, dict):
+        return {k: to_json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_safe(v) for v in value]
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        return value if np.isfinite(value) else None
+    if isinstance(value, np.bool_):
+        return bool(value)
+    return value
+
+
+def run_backtest(symbol, start_date, end_date, params, definition=None, execution=None):
+    """Run a single backtest; executed in a worker process.
+
+    definition is a saved Strategy Builder strategy; without one the
+    built-in RSI/MA rule runs with params. execution is an optional
+    ExecutionSimulator config; without one signals fill at the close.
+    """
+    # The engine stack is imported here so the web process can queue jobs
+    # without loading NumPy and pandas
+    from trading_engine.compiler import get_compiled_strategy
+    from trading_engine.execution import ExecutionSimulator
+    from trading_engine.result_cache import get_result_cache
+    from trading_engine.strategy import TradingStrategy
+
+    strategy = TradingStrategy(symbol, start_date, end_date, result_cache=get_result_cache())
+    simulator = ExecutionSimulator.from_config(execution) if execution else None
+    if definition is not None:
+        return to_json_safe(strategy.backtest_plan(get_compiled_strategy(definition), execution=simulator))
+    return to_json_safe(strategy.backtest(params, execution=simulator))
+
+
+def _run_job(parent_pid, *args):
+    """Worker entry point: run a backtest and hand back the stage timings it recorded.
+
+    Stages recorded in a child process never reach the parent's metrics, so
+    they are returned with the result; in-process runs are already counted.
+    """
+    with capture() as stages:
+        with stage('backtest.run'):
+            result = run_backtest(*args)
+    return result, stages if os.getpid() != parent_pid else []
+
+
+class BacktestQueue:
+    """Run backtests in a process pool and track them as pollable jobs.
+
+    Identical submissions share one job while it runs, and finished results
+    are served from a result cache instead of being recomputed. With a
+    store (a StateStore), job records are also saved there so a job can be
+    polled through any worker process, not just the one running it.
+    """
+
+    def __init__(self, max_workers=None, max_pending=32, max_jobs=1000, executor=None, store=None):
+        self.max_workers = max_workers or int(os.environ.get('BACKTEST_WORKERS', os.cpu_count() or 1))
+        self.max_pending = max_pending
+        self.max_jobs = max_jobs
+        self.results = TTLCache(maxsize=256, ttl=3600)
+        self._executor = executor
+        self.store = store
+        self._jobs = OrderedDict()
+        self._running = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            # Forking a threaded web process can copy a lock another thread
+            # holds (e.g. the bar store's during a fetch) into the worker,
+            # which then waits on it forever, so workers start fresh
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+
+    def submit(self, symbol, start_date, end_date, params=None, strategy=None, definition=None, execution=None):
+        """Queue a backtest and return its job record"""
+        params = params or {}
+        key = json.dumps(
+            [strategy, definition, symbol, start_date, end_date, params, execution], sort_keys=True, default=str
+        )
+
+        with self._lock:
+            job_id = self._running.get(key)
+            if job_id is not None:
+                return dict(self._jobs[job_id])
+
+            job = {
+                'id': uuid.uuid4().hex,
+                'status': 'queued',
+                'symbol': symbol,
+                'start_date': start_date,
+                'end_date': end_date,
+                'params': params,
+                'submitted': datetime.now().isoformat(),
+                'finished': None,
+                'result': None,
+                'error': None
+            }
+
+            result = self.results.get(key)
+            if result is not None:
+                job.update(status='done', result=result, finished=job['submitted'], cached=True)
+                self._add_job(job)
+                JOBS.inc(status='cached')
+                return dict(job)
+
+            if len(self._running) >= self.max_pending:
+                raise QueueFullError('Backtest queue is full, try again later')
+
+            self._add_job(job)
+            self._running[key] = job['id']
+
+        started = time.perf_counter()
+        try:
+            future = self.executor.submit(
+                _run_job, os.getpid(), symbol, start_date, end_date, params, definition, execution
+            )
+        except Exception:
+            with self._lock:
+                self._running.pop(key, None)
+                self._jobs.pop(job['id'], None)
+            raise
+        with self._lock:
+            self._futures[job['id']] = future
+        future.add_done_callback(lambda f: self._finish(key, job['id'], f, started))
+        return dict(job)
+
+    def _add_job(self, job):
+        self._jobs[job['id']] = job
+        if self.store is not None:
+            self.store.save_job(job)
+        # Forget the oldest finished jobs once the table is full
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id]['status'] in ('done', 'failed'):
+                del self._jobs[job_id]
+
+    def _finish(self, key, job_id, future, started):
+        with self._lock:
+            self._running.pop(key, None)
+            self._futures.pop(job_id, None)
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job['finished'] = datetime.now().isoformat()
+            try:
+                job['result'], stages = future.result()
+                job['status'] = 'done'
+                self.results.set(key, job['result'])
+                for name, seconds in stages:
+                    record_stage(name, seconds)
+            except Exception as e:
+                job['error'] = str(e)
+                job['status'] = 'failed'
+            if self.store is not None:
+                self.store.save_job(job)
+            JOB_SECONDS.observe(time.perf_counter() - started)
+            JOBS.inc(status=job['status'])
+
+    def get(self, job_id):
+        """Return a snapshot of a job, or None if it is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                # Submitted through another worker process
+                return self.store.get_job(job_id) if self.store is not None else None
+            future = self._futures.get(job_id)
+            if job['status'] == 'queued' and future is not None and future.running():
+                job['status'] = 'running'
+            return dict(job)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'pending': len(self._running),
+                'max_pending': self.max_pending,
+                'jobs': len(self._jobs),
+                'results': self.results.stats()
+            }
@@ -0,0 +1,267 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+DEFAULT_LEDGER_PATH = os.environ.get(
+    'LEDGER_DB',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'ledger.db')
+)
+
+TRADE_FIELDS = ('id', 'symbol', 'type', 'quantity', 'price', 'timestamp')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL,
+    type TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    price REAL NOT NULL,
+    timestamp TEXT NOT NULL,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trades_symbol ON trades (symbol, id);
+CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades (timestamp, id);
+CREATE TABLE IF NOT EXISTS positions (
+    symbol TEXT PRIMARY KEY,
+    quantity REAL NOT NULL,
+    current_price REAL NOT NULL,
+    total_value REAL NOT NULL,
+    daily_change REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS portfolio (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+"""
+
+# Sample data loaded into a brand new ledger
+SEED_POSITIONS = [
+    {'symbol': 'AAPL', 'quantity': 100, 'current_price': 150.25, 'total_value': 15025, 'daily_change': 125},
+    {'symbol': 'MSFT', 'quantity': 50, 'current_price': 250.75, 'total_value': 12537.5, 'daily_change': 87.5}
+]
+SEED_TRADES = [
+    {'symbol': 'AAPL', 'type': 'buy', 'quantity': 10, 'price': 149.50, 'timestamp': '2024-03-20T10:30:00Z'},
+    {'symbol': 'MSFT', 'type': 'sell', 'quantity': 5, 'price': 251.25, 'timestamp': '2024-03-20T11:15:00Z'}
+]
+SEED_PORTFOLIO = {'daily_change': 1500, 'daily_change_percent': 1.5}
+
+
+def enable_wal(conn, attempts=50):
+    """Switch a connection to WAL mode.
+
+    Changing the journal mode does not wait on the busy timeout, so this
+    retries while other processes opening the same new database hold it.
+    """
+    for attempt in range(attempts):
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            return
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) or attempt == attempts - 1:
+                raise
+            time.sleep(0.01)
+
+
+def _number(value):
+    """Keep whole numbers as ints so the JSON matches what clients sent"""
+    return int(value) if float(value).is_integer() else value
+
+
+class Ledger:
+    """Trade ledger and portfolio positions backed by SQLite.
+
+    Positions are kept in a symbol -> position dict and the portfolio value
+    is updated incrementally, so recording a trade does not scan the book.
+    Every trade and position change is written in the same transaction.
+    Several processes can share one database: the book is reloaded whenever
+    SQLite reports a commit made by another connection.
+    """
+
+    def __init__(self, path=DEFAULT_LEDGER_PATH, seed=True):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ':memory:':
+            enable_wal(self._conn)
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        if seed:
+            self._seed()
+        self._load()
+
+    def _seed(self):
+        with self._conn:
+            # Checked inside the write transaction so that workers starting
+            # together on a new database seed it only once
+            self._conn.execute('BEGIN IMMEDIATE')
+            if self._conn.execute('SELECT COUNT(*) FROM positions').fetchone()[0] \
+                    or self._conn.execute('SELECT COUNT(*) FROM trades').fetchone()[0]:
+                return
+            for p in SEED_POSITIONS:
+                self._conn.execute(
+                    'INSERT INTO positions VALUES (?, ?, ?, ?, ?)',
+                    (p['symbol'], p['quantity'], p['current_price'], p['total_value'], p['daily_change'])
+                )
+            for t in SEED_TRADES:
+                self._conn.execute(
+                    'INSERT INTO trades (symbol, type, quantity, price, timestamp) VALUES (?, ?, ?, ?, ?)',
+                    (t['symbol'], t['type'], t['quantity'], t['price'], t['timestamp'])
+                )
+            for key, value in SEED_PORTFOLIO.items():
+                self._conn.execute('INSERT INTO portfolio VALUES (?, ?)', (key, value))
+
+    def _load(self):
+        self._data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        self._positions = {}
+        for row in self._conn.execute('SELECT * FROM positions ORDER BY rowid'):
+            position = {k: _number(row[k]) for k in row.keys() if k != 'symbol'}
+            position['symbol'] = row['symbol']
+            self._positions[row['symbol']] = position
+        self._totals = {row['key']: _number(row['value']) for row in self._conn.execute('SELECT * FROM portfolio')}
+        self._total_value = sum(p['total_value'] for p in self._positions.values())
+
+    def _sync(self):
+        # data_version only changes when another connection commits, so this
+        # is a cheap check that the in-memory book is current
+        if self._conn.execute('PRAGMA data_version').fetchone()[0] != self._data_version:
+            self._load()
+
+    def add_trade(self, trade):
+        """Record a trade, update the position it touches and return the stored trade"""
+        trade = dict(trade)
+        for field in ('symbol', 'type', 'quantity', 'price'):
+            if trade.get(field) is None:
+                raise ValueError('Missing trade field: {}'.format(field))
+        if trade['type'] not in ('buy', 'sell'):
+            raise ValueError('Trade type must be buy or sell')
+        trade['quantity'] = _number(float(trade['quantity']))
+        trade['price'] = _number(float(trade['price']))
+        trade['timestamp'] = datetime.now().isoformat()
+        extra = {k: v for k, v in trade.items() if k not in TRADE_FIELDS}
+
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute('BEGIN IMMEDIATE')
+                    self._sync()
+                    cursor = self._conn.execute(
+                        'INSERT INTO trades (symbol, type, quantity, price, timestamp, extra) '
+                        'VALUES (?, ?, ?, ?, ?, ?)',
+                        (trade['symbol'], trade['type'], trade['quantity'], trade['price'],
+                         trade['timestamp'], json.dumps(extra) if extra else None)
+                    )
+                    trade['id'] = str(cursor.lastrowid)
+                    self._update_position(trade)
+            except Exception:
+                # The transaction was rolled back; resync the in-memory book
+                self._load()
+                raise
+        return trade
+
+    def _update_position(self, trade):
+        position = self._positions.get(trade['symbol'])
+        before = position['total_value'] if position else 0
+
+        if position:
+            if trade['type'] == 'buy':
+                position['quantity'] += trade['quantity']
+            else:
+                position['quantity'] -= trade['quantity']
+            position['total_value'] = position['quantity'] * position['current_price']
+        elif trade['type'] == 'buy':
+            position = {
+                'symbol': trade['symbol'],
+                'quantity': trade['quantity'],
+                'current_price': trade['price'],
+                'total_value': trade['quantity'] * trade['price'],
+                'daily_change': 0
+            }
+            self._positions[trade['symbol']] = position
+        else:
+            return
+
+        # Remove position if quantity is 0
+        if position['quantity'] == 0:
+            del self._positions[trade['symbol']]
+            self._conn.execute('DELETE FROM positions WHERE symbol = ?', (trade['symbol'],))
+            self._total_value -= before
+        else:
+            self._conn.execute(
+                'INSERT INTO positions VALUES (?, ?, ?, ?, ?) ON CONFLICT (symbol) DO UPDATE SET '
+                'quantity = excluded.quantity, total_value = excluded.total_value',
+                (position['symbol'], position['quantity'], position['current_price'],
+                 position['total_value'], position['daily_change'])
+            )
+            self._total_value += position['total_value'] - before
+
+    def portfolio(self):
+        """Return the portfolio summary with all open positions"""
+        with self._lock:
+            self._sync()
+            return dict(
+                self._totals,
+                total_value=self._total_value,
+                positions=[dict(p) for p in self._positions.values()]
+            )
+
+    def get_position(self, symbol):
+        with self._lock:
+            self._sync()
+            position = self._positions.get(symbol)
+            return dict(position) if position else None
+
+    def list_trades(self, symbol=None, side=None, since=None, until=None, cursor=None, limit=100):
+        """Return one page of trades in id order and the cursor for the next page"""
+        clauses, args = [], []
+        if cursor is not None:
+            try:
+                cursor = int(cursor)
+            except ValueError:
+                raise ValueError('Invalid cursor: {}'.format(cursor))
+            clauses.append('id > ?')
+            args.append(cursor)
+        if symbol:
+            clauses.append('symbol = ?')
+            args.append(symbol)
+        if side:
+            if side not in ('buy', 'sell'):
+                raise ValueError('Trade side must be buy or sell')
+            clauses.append('type = ?')
+            args.append(side)
+        if since:
+            clauses.append('timestamp >= ?')
+            args.append(since)
+        if until:
+            clauses.append('timestamp < ?')
+            args.append(until)
+        where = 'WHERE ' + ' AND '.join(clauses) if clauses else ''
+        args.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT * FROM trades {} ORDER BY id LIMIT ?'.format(where), args
+            ).fetchall()
+
+        trades = []
+        for row in rows[:limit]:
+            trade = json.loads(row['extra']) if row['extra'] else {}
+            trade.update({
+                'id': str(row['id']),
+                'symbol': row['symbol'],
+                'type': row['type'],
+                'quantity': _number(row['quantity']),
+                'price': _number(row['price']),
+                'timestamp': row['timestamp']
+            })
+            trades.append(trade)
+        next_cursor = trades[-1]['id'] if len(rows) > limit else None
+        return trades, next_cursor
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,320 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+METRIC_KEYS = [
+    'total_return', 'cagr', 'sharpe_ratio', 'sortino_ratio', 'max_drawdown',
+    'max_drawdown_duration', 'exposure', 'turnover', 'win_rate'
+]
+
+
+def _safe(value):
+    """Plain Python float, with NaN/inf reported as 0"""
+    value = float(value)
+    return value if math.isfinite(value) else 0.0
+
+
+def empty_metrics():
+    return {key: 0 for key in METRIC_KEYS}
+
+
+def _entry_close(close, position, entry=None, previous=None):
+    """Close of the bar where each bar's run of a constant position started.
+
+    entry and previous carry the entry close and position from the bar
+    before the first one, for series processed in chunks.
+    """
+    changed = np.ones(position.shape, dtype=bool)
+    changed[1:] = position[1:] != position[:-1]
+    if previous is not None:
+        changed[0] = position[0] != previous
+    rows = np.arange(len(close)).reshape((-1,) + (1,) * (close.ndim - 1))
+    last = np.where(changed, rows, -1)
+    np.maximum.accumulate(last, axis=0, out=last)
+    started = np.take_along_axis(close, np.maximum(last, 0), axis=0)
+    if entry is not None:
+        started = np.where(last >= 0, started, entry)
+    return started
+
+
+def position_basis(close, position, entry=None, previous=None):
+    """Equity per share held after each bar, for 1-D or 2-D (dates x symbols) inputs.
+
+    A position buys or shorts all equity at the close where it is entered
+    and then holds that share count, so a long is worth the close per share
+    and a short 2 x entry - close. Flat bars report the entry close.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    position = np.asarray(position, dtype=np.float64)
+    entry = _entry_close(close, position, entry, previous)
+    return entry + position * (close - entry)
+
+
+def bar_returns(close, position):
+    """Per-bar strategy returns from the position held since the previous close.
+
+    Works on 1-D series and 2-D (dates x symbols) panels. The share count
+    is fixed while a position is held, as in ExecutionSimulator, rather
+    than rebalanced every bar.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    position = np.asarray(position, dtype=np.float64)
+    returns = np.zeros(close.shape)
+    if len(close) > 1:
+        basis = position_basis(close, position)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns[1:] = position[:-1] * (close[1:] - close[:-1]) / basis[:-1]
+        returns[~np.isfinite(returns)] = 0
+    return returns
+
+
+def equity_curve(close, position, initial_capital=1.0):
+    """Mark-to-market equity after every bar"""
+    return initial_capital * np.cumprod(1 + bar_returns(close, position))
+
+
+def span_years(n_bars, index, periods_per_year):
+    """Years covered by n_bars bars, from the index dates when there are any"""
+    if isinstance(index, pd.DatetimeIndex) and len(index) > 1:
+        days = (index[-1] - index[0]).total_seconds() / 86400
+        if days > 0:
+            return days / 365.25
+    return n_bars / periods_per_year
+
+
+def equity_metrics(equity, position=None, index=None, periods_per_year=252):
+    """Compute performance metrics from an equity curve in one vectorized pass.
+
+    position is the position held after each bar; it is needed for exposure,
+    turnover and win rate. Returns JSON-safe floats.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    n = len(equity)
+    if n < 2:
+        return empty_metrics()
+
+    returns = np.zeros(n)
+    returns[1:] = equity[1:] / equity[:-1] - 1
+    returns[~np.isfinite(returns)] = 0
+    years = span_years(n, index, periods_per_year)
+    scale = math.sqrt(periods_per_year)
+
+    mean = returns[1:].mean()
+    std = returns[1:].std(ddof=1)
+    downside = math.sqrt(np.mean(np.minimum(returns[1:], 0) ** 2))
+
+    growth = equity[-1] / equity[0]
+    cagr = growth ** (1 / years) - 1 if growth > 0 and years > 0 else -1.0
+
+    # Drawdown and the longest stretch spent below a previous peak
+    peak = np.maximum.accumulate(equity)
+    drawdown = 1 - equity / peak
+    bars = np.arange(n)
+    last_peak = np.maximum.accumulate(np.where(equity >= peak, bars, 0))
+
+    result = {
+        'total_return': _safe(growth - 1),
+        'cagr': _safe(cagr),
+        'sharpe_ratio': _safe(mean / std * scale) if std > 0 else 0.0,
+        'sortino_ratio': _safe(mean / downside * scale) if downside > 0 else 0.0,
+        'max_drawdown': _safe(drawdown.max()),
+        'max_drawdown_duration': int((bars - last_peak).max()),
+        'exposure': 0.0,
+        'turnover': 0.0,
+        'win_rate': 0.0
+    }
+
+    if position is not None:
+        position = np.asarray(position, dtype=np.float64)
+        changes = np.abs(np.diff(position))
+        result['exposure'] = _safe(np.mean(position[:-1] != 0))
+        # Total absolute position change per year
+        result['turnover'] = _safe(changes.sum() / years) if years > 0 else 0.0
+
+        # Each run of a constant non-zero position is one trade, marked to
+        # market at the bar where it is closed (or the last bar if still open)
+        starts = np.concatenate(([0], np.flatnonzero(changes) + 1))
+        ends = np.append(starts[1:], n - 1)
+        held = position[starts] != 0
+        if held.any():
+            trade_returns = equity[ends[held]] / equity[starts[held]] - 1
+            result['win_rate'] = _safe(np.mean(trade_returns > 0))
+
+    return result
+
+
+def performance_metrics(close, position, index=None, periods_per_year=252):
+    """Build the per-bar equity curve for a position series and measure it"""
+    equity = equity_curve(close, position)
+    return equity_metrics(equity, position, index=index, periods_per_year=periods_per_year)
+
+
+def panel_trades(position, value):
+    """Count the trades and the winning trades in a (dates x symbols) panel.
+
+    As in equity_metrics, each run of a constant non-zero position in a
+    column is one trade, marked to market on that column's value curve at
+    the bar where it is closed (or the last bar if still open).
+    """
+    position = np.asarray(position)
+    value = np.asarray(value, dtype=np.float64)
+    n = len(position)
+    if n == 0:
+        return 0, 0
+    # Runs in column-major order: every column starts a new run on its first row
+    starts = np.ones(position.shape, dtype=bool)
+    starts[1:] = position[1:] != position[:-1]
+    starts = np.flatnonzero(starts.T)
+    column_start = starts % n == 0
+    # A run ends where the next one starts, or on its column's last row
+    ends = np.append(starts[1:] - column_start[1:], position.size - 1)
+    held = position.T.ravel()[starts] != 0
+    flat_value = value.T.ravel()
+    returns = flat_value[ends[held]] / flat_value[starts[held]] - 1
+    return int(np.count_nonzero(held)), int(np.count_nonzero(returns > 0))
+
+
+class MetricsAccumulator:
+    """Compute equity_metrics incrementally over consecutive chunks of bars.
+
+    Feed each chunk's closes and positions in order with update(); the
+    running equity, peak, return moments and open trade are carried across
+    chunk boundaries, so memory use is bounded by the chunk size.
+    """
+
+    def __init__(self, periods_per_year=252):
+        self.periods_per_year = periods_per_year
+        self.n = 0
+        self.first_time = None
+        self.last_time = None
+        self.prev_close = None
+        self.prev_position = 0.0
+        self.prev_basis = None
+        self.entry_close = None
+        self.equity = 1.0
+        self.peak = 1.0
+        self.last_peak = 0
+        self.max_drawdown = 0.0
+        self.max_duration = 0
+        # Moments of the bar returns, excluding the first bar
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.downside_sq = 0.0
+        self.held_bars = 0
+        self.changes = 0.0
+        # The open run of a constant position and the trades closed so far
+        self.segment_equity = 1.0
+        self.segment_position = 0.0
+        self.closed_trades = 0
+        self.winning_trades = 0
+
+    def update(self, close, position, index=None):
+        close = np.asarray(close, dtype=np.float64)
+        position = np.asarray(position, dtype=np.float64)
+        m = len(close)
+        if m == 0:
+            return
+        first = self.n == 0
+        if isinstance(index, pd.DatetimeIndex):
+            if first:
+                self.first_time = index[0]
+            self.last_time = index[-1]
+
+        previous_close = np.empty(m)
+        previous_close[1:] = close[:-1]
+        previous_close[0] = close[0] if first else self.prev_close
+        previous_position = np.empty(m)
+        previous_position[1:] = position[:-1]
+        previous_position[0] = position[0] if first else self.prev_position
+        # The run of a position open at the chunk boundary keeps its entry close
+        entry = _entry_close(close, position, self.entry_close, None if first else self.prev_position)
+        basis = entry + position * (close - entry)
+        previous_basis = np.empty(m)
+        previous_basis[1:] = basis[:-1]
+        previous_basis[0] = basis[0] if first else self.prev_basis
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = previous_position * (close - previous_close) / previous_basis
+        returns[~np.isfinite(returns)] = 0
+        if first:
+            returns[0] = 0
+
+        # Merge this chunk's return moments into the running totals
+        sample = returns[1:] if first else returns
+        if len(sample):
+            count = len(sample)
+            mean = sample.mean()
+            m2 = np.sum((sample - mean) ** 2)
+            delta = mean - self.mean
+            total = self.count + count
+            self.mean += delta * count / total
+            self.m2 += m2 + delta ** 2 * self.count * count / total
+            self.count = total
+            self.downside_sq += np.sum(np.minimum(sample, 0) ** 2)
+
+        equity = self.equity * np.cumprod(1 + returns)
+        peak = np.maximum.accumulate(np.concatenate(([self.peak], equity)))[1:]
+        self.max_drawdown = max(self.max_drawdown, float(np.max(1 - equity / peak)))
+        bars = np.arange(self.n, self.n + m)
+        last_peak = np.maximum.accumulate(
+            np.concatenate(([self.last_peak], np.where(equity >= peak, bars, 0)))
+        )[1:]
+        self.max_duration = max(self.max_duration, int(np.max(bars - last_peak)))
+
+        self.held_bars += int(np.count_nonzero(position))
+        diff = np.abs(position - previous_position)
+        self.changes += float(diff.sum())
+
+        if first:
+            self.segment_equity = equity[0]
+            self.segment_position = position[0]
+        starts = np.flatnonzero(diff)
+        if len(starts):
+            start_equity = np.concatenate(([self.segment_equity], equity[starts[:-1]]))
+            start_position = np.concatenate(([self.segment_position], position[starts[:-1]]))
+            held = start_position != 0
+            self.closed_trades += int(np.count_nonzero(held))
+            self.winning_trades += int(np.count_nonzero(equity[starts][held] / start_equity[held] - 1 > 0))
+            self.segment_equity = equity[starts[-1]]
+            self.segment_position = position[starts[-1]]
+
+        self.n += m
+        self.prev_close = close[-1]
+        self.prev_position = position[-1]
+        self.prev_basis = basis[-1]
+        self.entry_close = entry[-1]
+        self.equity = equity[-1]
+        self.peak = peak[-1]
+        self.last_peak = last_peak[-1]
+
+    def result(self):
+        n = self.n
+        if n < 2:
+            return empty_metrics()
+        index = pd.DatetimeIndex([self.first_time, self.last_time]) if self.first_time is not None else None
+        years = span_years(n, index, self.periods_per_year)
+        scale = math.sqrt(self.periods_per_year)
+
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float('nan')
+        downside = math.sqrt(self.downside_sq / self.count)
+        growth = self.equity
+        cagr = growth ** (1 / years) - 1 if growth > 0 and years > 0 else -1.0
+
+        # The still-open run is marked to market at the last bar
+        trades, wins = self.closed_trades, self.winning_trades
+        if self.segment_position != 0:
+            trades += 1
+            wins += int(self.equity / self.segment_equity - 1 > 0)
+
+        return {
+            'total_return': _safe(growth - 1),
+            'cagr': _safe(cagr),
+            'sharpe_ratio': _safe(self.mean / std * scale) if std > 0 else 0.0,
+            'sortino_ratio': _safe(self.mean / downside * scale) if downside > 0 else 0.0,
+            'max_drawdown': _safe(self.max_drawdown),
+            'max_drawdown_duration': self.max_duration,
+            'exposure': _safe((self.held_bars - (self.prev_position != 0)) / (n - 1)),
+            'turnover': _safe(self.changes / years) if years > 0 else 0.0,
+            'win_rate': _safe(wins / trades) if trades else 0.0
+        }
@@ -0,0 +1,161 @@
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from trading_engine import indicators, metrics
+from trading_engine.signals import rsi_ma_signals, signal_positions
+
+DEFAULT_PARAMS = {
+    'ma_window': 20,
+    'rsi_window': 14,
+    'rsi_overbought': 70,
+    'rsi_oversold': 30
+}
+
+# Metrics where a smaller value ranks higher
+ASCENDING_METRICS = {'max_drawdown'}
+
+# Arrays attached from shared memory in each worker process
+_shared = {}
+
+
+def expand_grid(param_grid, n_iter=None, seed=None):
+    """Expand a {param: [values]} grid into parameter dicts.
+
+    When n_iter is given, a random sample of that many combinations is drawn
+    instead of the full grid.
+    """
+    names = sorted(param_grid)
+    combos = list(itertools.product(*(param_grid[name] for name in names)))
+    if n_iter is not None and n_iter < len(combos):
+        combos = random.Random(seed).sample(combos, n_iter)
+    return [dict(DEFAULT_PARAMS, **dict(zip(names, combo))) for combo in combos]
+
+
+def indicator_tables(close, combos):
+    """Compute every distinct MA and RSI window once for the whole sweep.
+
+    Returns (ma, ma_rows, rsi, rsi_rows): one row of values per window, and
+    the row of each window.
+    """
+    ma_windows = sorted({p['ma_window'] for p in combos})
+    rsi_windows = sorted({p['rsi_window'] for p in combos})
+    ma = np.vstack([indicators.sma(close, w).to_numpy() for w in ma_windows])
+    rsi = np.vstack([indicators.rsi(close, w).to_numpy() for w in rsi_windows])
+    return ma, {w: i for i, w in enumerate(ma_windows)}, rsi, {w: i for i, w in enumerate(rsi_windows)}
+
+
+def evaluate_combos(combos, close, ma, ma_rows, rsi, rsi_rows, span, periods_per_year):
+    """Backtest each parameter combination against the tables from indicator_tables"""
+    rows = []
+    for params in combos:
+        buy, sell = rsi_ma_signals(
+            close,
+            ma[ma_rows[params['ma_window']]],
+            rsi[rsi_rows[params['rsi_window']]],
+            params['rsi_oversold'],
+            params['rsi_overbought']
+        )
+        position = signal_positions(buy, sell)
+        num_trades = int(np.count_nonzero(np.diff(position)))
+        if num_trades:
+            performance = metrics.performance_metrics(
+                close, position, index=span, periods_per_year=periods_per_year
+            )
+        else:
+            performance = metrics.empty_metrics()
+        performance['num_trades'] = num_trades
+        rows.append(dict(params, **performance))
+    return rows
+
+
+def _attach(name, layout):
+    """Pool initializer: map the shared price and indicator arrays read-only"""
+    shm = shared_memory.SharedMemory(name=name)
+    _shared['shm'] = shm
+    for key, (offset, shape) in layout.items():
+        array = np.ndarray(shape, dtype=np.float64, buffer=shm.buf, offset=offset)
+        array.flags.writeable = False
+        _shared[key] = array
+
+
+def _evaluate_shared(combos, ma_rows, rsi_rows, span, periods_per_year):
+    return evaluate_combos(
+        combos, _shared['close'], _shared['ma'], ma_rows, _shared['rsi'], rsi_rows, span, periods_per_year
+    )
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def optimize(strategy, param_grid, metric='total_return', n_iter=None, seed=None,
+             max_workers=None, chunk_size=None, periods_per_year=252):
+    """Grid or random search over RSI/MA strategy parameters.
+
+    Price data is loaded once and, together with each distinct indicator
+    window, placed in shared memory that every worker reads without copying.
+    Returns the ranked results table and timing information.
+    """
+    started = time.perf_counter()
+    if strategy.data is None:
+        strategy.fetch_data()
+    combos = expand_grid(param_grid, n_iter=n_iter, seed=seed)
+    close = strategy.data['Close'].to_numpy(dtype=np.float64)
+    ma, ma_rows, rsi, rsi_rows = indicator_tables(strategy.data['Close'], combos)
+    # First and last date are all the metrics need to annualise
+    span = strategy.data.index[[0, -1]] if len(strategy.data) else None
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(combos) < 2:
+        rows = evaluate_combos(combos, close, ma, ma_rows, rsi, rsi_rows, span, periods_per_year)
+    else:
+        arrays = {'close': close, 'ma': ma, 'rsi': rsi}
+        layout = {}
+        offset = 0
+        for key, array in arrays.items():
+            layout[key] = (offset, array.shape)
+            offset += array.nbytes
+
+        shm = shared_memory.SharedMemory(create=True, size=offset)
+        try:
+            for key, array in arrays.items():
+                start, shape = layout[key]
+                np.ndarray(shape, dtype=np.float64, buffer=shm.buf, offset=start)[:] = array
+
+            chunk_size = chunk_size or max(1, len(combos) // (max_workers * 4))
+            rows = []
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach,
+                                     initargs=(shm.name, layout)) as executor:
+                futures = [
+                    executor.submit(_evaluate_shared, chunk, ma_rows, rsi_rows, span, periods_per_year)
+                    for chunk in _chunks(combos, chunk_size)
+                ]
+                for future in futures:
+                    rows.extend(future.result())
+        finally:
+            shm.close()
+            shm.unlink()
+
+    results = pd.DataFrame(rows)
+    if metric not in results.columns:
+        raise ValueError('Unknown metric: {}'.format(metric))
+    results = results.sort_values(
+        metric, ascending=metric in ASCENDING_METRICS, na_position='last', kind='stable'
+    ).reset_index(drop=True)
+
+    wall_time = time.perf_counter() - started
+    return {
+        'results': results,
+        'metric': metric,
+        'combinations': len(combos),
+        'wall_time': wall_time,
+        'combinations_per_sec': len(combos) / wall_time if wall_time else 0
+    }
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+from trading_engine import indicators, metrics
+from trading_engine.data_store import get_bar_store
+from trading_engine.signals import rsi_ma_signals, signal_positions
+
+
+class PortfolioStrategy:
+    """Run the RSI + moving average rule across many symbols at once.
+
+    Prices are held in one aligned (dates x symbols) panel and every step
+    works on whole columns, so there is no Python loop per symbol. Each
+    symbol gets an equal capital sleeve that buys or shorts its whole value
+    when the target position (-1, 0 or 1) changes and holds those shares
+    until the next change, like the single-symbol backtest.
+    """
+
+    def __init__(self, symbols, start_date, end_date, store=None, dtype=np.float64):
+        self.symbols = list(symbols)
+        self.start_date = start_date
+        self.end_date = end_date
+        self.store = store
+        self.dtype = np.dtype(dtype)
+        self.data = None
+
+    def fetch_data(self):
+        """Load closing prices for every symbol into one aligned panel"""
+        store = self.store or get_bar_store()
+        closes = {
+            symbol: store.history(symbol, self.start_date, self.end_date)['Close'].astype(self.dtype)
+            for symbol in self.symbols
+        }
+        self.data = pd.DataFrame(closes).sort_index().astype(self.dtype)
+        return self.data
+
+    def backtest(self, strategy_params, initial_capital=100000, chunk_size=None):
+        """Backtest the strategy on every symbol in the panel.
+
+        chunk_size limits how many symbol columns are processed at a time,
+        which bounds the size of the indicator and equity work arrays.
+        """
+        if self.data is None:
+            self.fetch_data()
+
+        ma_window = strategy_params.get('ma_window', 20)
+        rsi_window = strategy_params.get('rsi_window', 14)
+        rsi_overbought = strategy_params.get('rsi_overbought', 70)
+        rsi_oversold = strategy_params.get('rsi_oversold', 30)
+
+        n_dates, n_symbols = self.data.shape
+        chunk_size = chunk_size or n_symbols or 1
+        sleeve = initial_capital / n_symbols if n_symbols else 0
+
+        equity = np.zeros(n_dates)
+        cash = np.zeros(n_dates)
+        positions = np.zeros((n_dates, n_symbols), dtype=np.int8)
+        final_equity = np.zeros(n_symbols)
+        trade_counts = np.zeros(n_symbols, dtype=np.int64)
+        closed_trades = winning_trades = 0
+        peak_chunk_bytes = 0
+
+        for start in range(0, n_symbols, chunk_size):
+            stop = min(start + chunk_size, n_symbols)
+            panel = self.data.iloc[:, start:stop]
+            close = panel.to_numpy(dtype=self.dtype)
+            ma = indicators.sma(panel, ma_window).to_numpy(dtype=self.dtype)
+            rsi = indicators.rsi(panel, rsi_window).to_numpy(dtype=self.dtype)
+
+            buy, sell = rsi_ma_signals(close, ma, rsi, rsi_oversold, rsi_overbought)
+            position = signal_positions(buy, sell)
+
+            # Bar returns earned by the position held since the previous close
+            returns = metrics.bar_returns(close, position).astype(self.dtype)
+            growth = 1 + returns[1:]
+            value = np.empty_like(close)
+            value[0] = sleeve
+            np.cumprod(growth, axis=0, out=value[1:])
+            value[1:] *= sleeve
+
+            equity += value.sum(axis=1, dtype=np.float64)
+            # Longs are fully invested, shorts hold the sale proceeds as cash
+            held = value * close / metrics.position_basis(close, position)
+            held = np.where(np.isfinite(held), held, value)
+            cash += (value - position * held).sum(axis=1, dtype=np.float64)
+            positions[:, start:stop] = position
+            final_equity[start:stop] = value[-1] if n_dates else sleeve
+            trade_counts[start:stop] = np.count_nonzero(np.diff(position, axis=0), axis=0)
+            trades, wins = metrics.panel_trades(position, value)
+            closed_trades += trades
+            winning_trades += wins
+
+            chunk_bytes = sum(a.nbytes for a in (close, ma, rsi, buy, sell, position, returns, growth, value))
+            peak_chunk_bytes = max(peak_chunk_bytes, chunk_bytes)
+
+        dates = self.data.index
+        total_return = equity[-1] / initial_capital - 1 if n_dates and initial_capital else 0
+        performance = metrics.equity_metrics(equity, index=dates)
+        if n_dates > 1 and n_symbols:
+            # Each sleeve holds 1 / n_symbols of the capital
+            years = metrics.span_years(n_dates, dates, 252)
+            performance['exposure'] = float(np.count_nonzero(positions[:-1]) / ((n_dates - 1) * n_symbols))
+            changes = np.abs(np.diff(positions, axis=0).astype(np.int64)).sum()
+            performance['turnover'] = float(changes / n_symbols / years) if years > 0 else 0.0
+            performance['win_rate'] = winning_trades / closed_trades if closed_trades else 0.0
+        return {
+            'total_return': float(total_return),
+            'equity': pd.Series(equity, index=dates),
+            'cash': pd.Series(cash, index=dates),
+            'positions': pd.DataFrame(positions, index=dates, columns=self.data.columns),
+            'final_equity': pd.Series(final_equity, index=self.data.columns),
+            'trades': pd.Series(trade_counts, index=self.data.columns),
+            'metrics': performance,
+            'memory': {
+                'panel_bytes': int(self.data.memory_usage(index=False).sum()),
+                'positions_bytes': int(positions.nbytes),
+                'peak_chunk_bytes': int(peak_chunk_bytes)
+            }
+        }
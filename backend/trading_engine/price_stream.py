@@ -0,0 +1,146 @@
+import json
+import queue
+import random
+import threading
+import time
+from collections import Counter
+
+
+class YFinanceTickSource:
+    """Latest price for a symbol from Yahoo Finance one-minute bars"""
+
+    def latest(self, symbol):
+        import yfinance as yf
+        hist = yf.Ticker(symbol).history(period='1d', interval='1m')
+        if hist.empty:
+            return None
+        return float(hist['Close'].iloc[-1])
+
+
+class SyntheticTickSource:
+    """Deterministic random-walk prices for local runs and load tests"""
+
+    def __init__(self, seed=0, start_price=100.0, volatility=0.001):
+        self.seed = seed
+        self.start_price = start_price
+        self.volatility = volatility
+        self._prices = {}
+        self._rngs = {}
+        self._lock = threading.Lock()
+
+    def latest(self, symbol):
+        with self._lock:
+            rng = self._rngs.get(symbol)
+            if rng is None:
+                rng = self._rngs[symbol] = random.Random('{}:{}'.format(self.seed, symbol))
+                self._prices[symbol] = self.start_price
+            self._prices[symbol] *= 1 + rng.gauss(0, self.volatility)
+            return round(self._prices[symbol], 4)
+
+
+class Subscriber:
+    """One client connection with a bounded event queue.
+
+    When the client falls behind, the oldest queued events are dropped so a
+    slow consumer never blocks the pollers or grows memory without bound.
+    """
+
+    def __init__(self, symbols, maxsize=100):
+        self.symbols = set(symbols)
+        self.queue = queue.Queue(maxsize)
+        self.dropped = 0
+
+    def push(self, event):
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class PriceStream:
+    """Fan out price ticks and portfolio updates to subscribed clients.
+
+    Each symbol has a single upstream poller thread shared by all of its
+    subscribers; it only publishes when the price changes and stops once
+    the last subscriber for that symbol leaves.
+    """
+
+    def __init__(self, source, interval=1.0, queue_size=100):
+        self.source = source
+        self.interval = interval
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._pollers = {}
+        self._refs = Counter()
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, symbols):
+        subscriber = Subscriber([s.upper() for s in symbols], maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            for symbol in subscriber.symbols:
+                self._refs[symbol] += 1
+                if symbol not in self._pollers:
+                    stop = threading.Event()
+                    thread = threading.Thread(target=self._poll, args=(symbol, stop), daemon=True)
+                    self._pollers[symbol] = stop
+                    thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            for symbol in subscriber.symbols:
+                self._refs[symbol] -= 1
+                if self._refs[symbol] <= 0:
+                    del self._refs[symbol]
+                    self._pollers.pop(symbol).set()
+
+    def _poll(self, symbol, stop):
+        while not stop.is_set():
+            try:
+                price = self.source.latest(symbol)
+            except Exception:
+                price = None
+            if price is not None and price != self._last.get(symbol, {}).get('price'):
+                tick = {'type': 'tick', 'symbol': symbol, 'price': price, 'time': time.time()}
+                self._last[symbol] = tick
+                self.publish(tick, symbol=symbol)
+            stop.wait(self.interval)
+
+    def publish(self, event, symbol=None):
+        """Send an event to subscribers of symbol, or to everyone if symbol is None"""
+        with self._lock:
+            targets = [s for s in self._subscribers if symbol is None or symbol in s.symbols]
+        for subscriber in targets:
+            subscriber.push(event)
+
+    def snapshot(self, symbols):
+        """Latest known tick for each symbol"""
+        return {s.upper(): self._last.get(s.upper()) for s in symbols}
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'pollers': len(self._pollers),
+                'dropped': sum(s.dropped for s in self._subscribers)
+            }
+
+
+def format_sse(event, data):
+    """Encode one Server-Sent Events message"""
+    return 'event: {}\ndata: {}\n\n'.format(event, json.dumps(data))
@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+from trading_engine.data_store import COLUMNS
+from trading_engine.jobs import to_json_safe
+from trading_engine.ledger import enable_wal
+
+DEFAULT_RESULT_CACHE_PATH = os.environ.get(
+    'RESULT_CACHE_DB',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'results.db')
+)
+DEFAULT_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+# Seconds hit/miss counts and LRU touches are buffered before they are written
+DEFAULT_FLUSH_INTERVAL = float(os.environ.get('RESULT_CACHE_FLUSH_INTERVAL', 5))
+
+# Bumped when the stored value format changes; older entries are dropped
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_last_used ON results (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0);
+"""
+
+
+def fingerprint(data):
+    """Content hash of the OHLCV bars a backtest runs on"""
+    columns = [c for c in COLUMNS if c in data.columns]
+    rows = pd.util.hash_pandas_object(data[columns], index=True).to_numpy()
+    digest = hashlib.sha256(','.join(columns).encode())
+    digest.update(rows.tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Persistent, size-bounded LRU cache of backtest results.
+
+    Entries are keyed by symbol, date range, strategy spec and a hash of the
+    bars, so a result is never served for data that has since changed.
+    Results are stored as JSON. The SQLite file is shared by every process,
+    including the backtest workers, so lookups do not write: hit/miss counts
+    and last-used times are kept in memory and written in one transaction
+    with the next put(), or once flush_interval seconds have passed.
+    """
+
+    def __init__(self, path=DEFAULT_RESULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._touched = {}
+        self._flushed = time.monotonic()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        if path != ':memory:':
+            enable_wal(self._conn)
+        with self._conn:
+            self._conn.execute('BEGIN IMMEDIATE')
+            if self._conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+                # Entries written in an older format are only a cache: drop them
+                self._conn.execute('DROP TABLE IF EXISTS results')
+                self._conn.execute('PRAGMA user_version = {}'.format(SCHEMA_VERSION))
+        self._conn.executescript(SCHEMA)
+
+    @staticmethod
+    def make_key(symbol, start_date, end_date, spec, data):
+        payload = json.dumps(
+            [symbol, str(start_date), str(end_date), spec, fingerprint(data)], sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self._pending['misses'] += 1
+            else:
+                self._pending['hits'] += 1
+                self._touched[key] = time.time()
+            if time.monotonic() - self._flushed >= self.flush_interval:
+                with self._conn:
+                    self._conn.execute('BEGIN IMMEDIATE')
+                    self._write_pending()
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, key, result):
+        """Store a result; NumPy and pandas values are converted to plain JSON types"""
+        text = json.dumps(to_json_safe(result))
+        size = len(text.encode())
+        if size > self.max_bytes:
+            return
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._write_pending()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)', (key, text, size, time.time())
+            )
+            self._evict()
+
+    def flush(self):
+        """Write the buffered hit/miss counts and last-used times"""
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._write_pending()
+
+    def _write_pending(self):
+        # Called with the lock held, inside a write transaction
+        if self._pending:
+            self._conn.executemany(
+                'UPDATE counters SET value = value + ? WHERE name = ?',
+                [(count, name) for name, count in self._pending.items()]
+            )
+        if self._touched:
+            self._conn.executemany(
+                'UPDATE results SET last_used = MAX(last_used, ?) WHERE key = ?',
+                [(used, key) for key, used in self._touched.items()]
+            )
+        self._pending.clear()
+        self._touched.clear()
+        self._flushed = time.monotonic()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._conn.execute('SELECT key, size FROM results ORDER BY last_used'):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany('DELETE FROM results WHERE key = ?', victims)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM results')
+
+    def stats(self):
+        self.flush()
+        with self._lock:
+            counters = dict(self._conn.execute('SELECT name, value FROM counters'))
+            entries, used = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        total = counters['hits'] + counters['misses']
+        return {
+            'entries': entries,
+            'bytes': used,
+            'max_bytes': self.max_bytes,
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'hit_ratio': counters['hits'] / total if total else 0
+        }
+
+
+_default_cache = None
+
+
+def get_result_cache():
+    """Return this process's handle on the shared result cache"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache()
+    return _default_cache
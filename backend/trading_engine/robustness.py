@@ -0,0 +1,254 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from trading_engine import indicators, metrics
+from trading_engine.optimizer import ASCENDING_METRICS, evaluate_combos, expand_grid, indicator_tables
+from trading_engine.signals import rsi_ma_signals, signal_positions
+
+# Metrics that only depend on the sequence of bar returns, so they stay
+# meaningful when the returns are resampled
+PATH_METRICS = [
+    'total_return', 'cagr', 'sharpe_ratio', 'sortino_ratio', 'max_drawdown', 'max_drawdown_duration'
+]
+
+# Strategy returns attached once in each Monte Carlo worker process
+_shared = {}
+
+
+def summarize(samples, confidence=0.95):
+    """Mean, spread and a central confidence interval for each metric column"""
+    frame = pd.DataFrame(samples)
+    alpha = (1 - confidence) / 2
+    summary = {}
+    for column in frame.columns:
+        values = pd.to_numeric(frame[column], errors='coerce').dropna()
+        if values.empty:
+            continue
+        summary[column] = {
+            'mean': float(values.mean()),
+            'std': float(values.std(ddof=1)) if len(values) > 1 else 0.0,
+            'median': float(values.median()),
+            'lower': float(values.quantile(alpha)),
+            'upper': float(values.quantile(1 - alpha))
+        }
+    return summary
+
+
+def _windows(n_bars, train_bars, test_bars, step_bars):
+    """(train start, test start, test end) bar offsets of each rolling window"""
+    return [
+        (start, start + train_bars, start + train_bars + test_bars)
+        for start in range(0, n_bars - train_bars - test_bars + 1, step_bars)
+    ]
+
+
+def _walk_forward_window(close, dates, train_bars, combos, metric, periods_per_year):
+    """Optimise on the train bars of a window, then trade the best params on the test bars"""
+    train_close = close[:train_bars]
+    ma, ma_rows, rsi, rsi_rows = indicator_tables(pd.Series(train_close), combos)
+    rows = evaluate_combos(
+        combos, train_close, ma, ma_rows, rsi, rsi_rows, dates[[0, train_bars - 1]], periods_per_year
+    )
+    best = sorted(rows, key=lambda row: row[metric], reverse=metric not in ASCENDING_METRICS)[0]
+    params = {key: best[key] for key in combos[0]}
+
+    # Indicators run over train + test so the test window starts warmed up,
+    # but the position always starts flat out of sample
+    series = pd.Series(close)
+    test_close = close[train_bars:]
+    buy, sell = rsi_ma_signals(
+        test_close,
+        indicators.sma(series, params['ma_window']).to_numpy()[train_bars:],
+        indicators.rsi(series, params['rsi_window']).to_numpy()[train_bars:],
+        params['rsi_oversold'],
+        params['rsi_overbought']
+    )
+    position = signal_positions(buy, sell)
+    num_trades = int(np.count_nonzero(np.diff(position)))
+    if num_trades:
+        performance = metrics.performance_metrics(
+            test_close, position, index=dates[[train_bars, -1]], periods_per_year=periods_per_year
+        )
+    else:
+        performance = metrics.empty_metrics()
+    performance['num_trades'] = num_trades
+
+    return dict(
+        params,
+        train_start=dates[0],
+        train_end=dates[train_bars - 1],
+        test_start=dates[train_bars],
+        test_end=dates[-1],
+        **{'in_sample_' + metric: best[metric]},
+        **performance
+    )
+
+
+def walk_forward(strategy, param_grid, train_bars, test_bars, step_bars=None, metric='total_return',
+                 n_iter=None, seed=None, confidence=0.95, max_workers=None, periods_per_year=252):
+    """Rolling walk-forward optimisation of the RSI/MA strategy.
+
+    Each window searches param_grid on train_bars bars, then trades the
+    winning parameters on the following test_bars bars. The window slides
+    by step_bars (default test_bars) and windows run in a process pool.
+    Returns the per-window table and the out-of-sample metric summary.
+    """
+    started = time.perf_counter()
+    if strategy.data is None:
+        strategy.fetch_data()
+    step_bars = step_bars or test_bars
+    if train_bars < 2 or test_bars < 2 or step_bars < 1:
+        raise ValueError('train_bars and test_bars must be at least 2 and step_bars at least 1')
+    combos = expand_grid(param_grid, n_iter=n_iter, seed=seed)
+    if metric not in metrics.METRIC_KEYS + ['num_trades']:
+        raise ValueError('Unknown metric: {}'.format(metric))
+
+    close = strategy.data['Close'].to_numpy(dtype=np.float64)
+    dates = strategy.data.index
+    windows = _windows(len(close), train_bars, test_bars, step_bars)
+    jobs = [
+        (close[start:end], dates[start:end], train_bars, combos, metric, periods_per_year)
+        for start, _, end in windows
+    ]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(jobs) < 2:
+        rows = [_walk_forward_window(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs))) as executor:
+            rows = list(executor.map(_walk_forward_window, *zip(*jobs)))
+
+    results = pd.DataFrame(rows)
+    out_of_sample = results[metrics.METRIC_KEYS] if len(results) else results
+    return {
+        'windows': results,
+        'metric': metric,
+        'summary': summarize(out_of_sample, confidence),
+        'wall_time': time.perf_counter() - started
+    }
+
+
+def resample_paths(returns, n_paths, block_size=1, rng=None):
+    """Draw n_paths bootstrap paths of returns as one (n_paths x len) array.
+
+    Paths are built from randomly placed blocks of block_size consecutive
+    returns, which keeps short-range autocorrelation; block_size=1 is the
+    plain i.i.d. bootstrap.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    returns = np.asarray(returns, dtype=np.float64)
+    m = len(returns)
+    block_size = max(1, min(int(block_size), m))
+    n_blocks = -(-m // block_size)
+    starts = rng.integers(0, m - block_size + 1, size=(n_paths, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :m]
+    return returns[idx]
+
+
+def path_metrics(returns, years, periods_per_year=252):
+    """Return-path metrics for every row of a (paths x bars) returns array.
+
+    Matches equity_metrics for a curve that starts at 1 before the first
+    return, computed for all paths at once.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n_paths, m = returns.shape
+    equity = np.ones((n_paths, m + 1))
+    np.cumprod(1 + returns, axis=1, out=equity[:, 1:])
+    scale = math.sqrt(periods_per_year)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = returns.mean(axis=1)
+        std = returns.std(axis=1, ddof=1) if m > 1 else np.zeros(n_paths)
+        downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2, axis=1))
+        growth = equity[:, -1]
+        cagr = np.where(growth > 0, growth ** (1 / years) - 1, -1.0) if years > 0 else np.full(n_paths, -1.0)
+        sharpe = np.where(std > 0, mean / std * scale, 0.0)
+        sortino = np.where(downside > 0, mean / downside * scale, 0.0)
+
+        peak = np.maximum.accumulate(equity, axis=1)
+        drawdown = (1 - equity / peak).max(axis=1)
+    bars = np.arange(m + 1)
+    last_peak = np.maximum.accumulate(np.where(equity >= peak, bars, 0), axis=1)
+
+    result = {
+        'total_return': growth - 1,
+        'cagr': cagr,
+        'sharpe_ratio': sharpe,
+        'sortino_ratio': sortino,
+        'max_drawdown': drawdown,
+        'max_drawdown_duration': (bars - last_peak).max(axis=1)
+    }
+    for key, values in result.items():
+        result[key] = np.where(np.isfinite(values), values, 0)
+    return result
+
+
+def _attach(returns):
+    """Pool initializer: keep the strategy returns for every batch in this worker"""
+    _shared['returns'] = returns
+
+
+def _simulate(n_paths, block_size, seed, years, periods_per_year, returns=None):
+    returns = _shared['returns'] if returns is None else returns
+    paths = resample_paths(returns, n_paths, block_size, np.random.default_rng(seed))
+    return path_metrics(paths, years, periods_per_year)
+
+
+def monte_carlo(strategy, strategy_params, n_paths=1000, block_size=1, seed=None, confidence=0.95,
+                batch_size=None, max_workers=None, periods_per_year=252):
+    """Monte Carlo robustness of a backtest by resampling its bar returns.
+
+    The strategy is backtested once; its per-bar returns are then
+    bootstrapped (in blocks of block_size bars) into n_paths synthetic
+    equity curves. Paths are generated and measured as batched arrays,
+    with batches spread over a process pool. Results are reproducible for
+    a given seed whatever the number of workers.
+    """
+    started = time.perf_counter()
+    observed = strategy.backtest(strategy_params)
+    observed = {key: value for key, value in observed.items() if key != 'trades'}
+    position = strategy.position_series()
+    close = strategy.data['Close'].to_numpy(dtype=np.float64)
+    returns = metrics.bar_returns(close, position)[1:]
+    if len(returns) < 2:
+        raise ValueError('Not enough bars to resample')
+    years = metrics.span_years(len(close), strategy.data.index, periods_per_year)
+
+    # Keep each batch's (paths x bars) working set to a few tens of MB
+    batch_size = batch_size or max(1, min(n_paths, 2000000 // len(returns)))
+    sizes = [min(batch_size, n_paths - i) for i in range(0, n_paths, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(sizes) < 2:
+        batches = [
+            _simulate(size, block_size, child, years, periods_per_year, returns=returns)
+            for size, child in zip(sizes, seeds)
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(sizes)), initializer=_attach,
+                                 initargs=(returns,)) as executor:
+            futures = [
+                executor.submit(_simulate, size, block_size, child, years, periods_per_year)
+                for size, child in zip(sizes, seeds)
+            ]
+            batches = [future.result() for future in futures]
+
+    simulations = pd.DataFrame({
+        key: np.concatenate([batch[key] for batch in batches]) for key in PATH_METRICS
+    })
+    return {
+        'observed': observed,
+        'simulations': simulations,
+        'summary': summarize(simulations, confidence),
+        'paths': n_paths,
+        'block_size': block_size,
+        'confidence': confidence,
+        'wall_time': time.perf_counter() - started
+    }
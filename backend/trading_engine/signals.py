@@ -0,0 +1,75 @@
+import numpy as np
+
+
+def rsi_ma_signals(close, ma, rsi, rsi_oversold, rsi_overbought):
+    """Build buy/sell masks for the RSI + moving average rule.
+
+    Inputs are 1-D series or 2-D (dates x symbols) panels; the first row
+    never trades.
+    """
+    close = np.asarray(close)
+    ma = np.asarray(ma)
+    rsi = np.asarray(rsi)
+
+    # Comparisons against NaN are False, which matches the warm-up behaviour
+    # of the bar-by-bar loop
+    with np.errstate(invalid='ignore'):
+        buy = (rsi < rsi_oversold) & (close > ma)
+        sell = (rsi > rsi_overbought) & (close < ma)
+
+    # The first bar never trades
+    buy[:1] = False
+    sell[:1] = False
+    return buy, sell
+
+
+def signal_to_trades(buy, sell, position=0):
+    """Run the long/short state machine over the signal masks.
+
+    A buy only fires while position <= 0 and a sell only while position >= 0,
+    like the if/elif loop, so a bar with both signals always trades: it buys
+    unless the position is long, and then it sells.
+    Returns the bar indices that trade and the position after each trade.
+    """
+    held = signal_positions(buy, sell, position)
+    previous = np.empty_like(held)
+    if len(held):
+        previous[0] = position
+        previous[1:] = held[:-1]
+    idx = np.flatnonzero(held != previous)
+    return idx, held[idx].astype(int)
+
+
+def signal_positions(buy, sell, position=0):
+    """Position held after each bar for 1-D or 2-D (dates x symbols) masks.
+
+    Equivalent to signal_to_trades run per column, starting from position.
+    A bar with only one signal sets the position; each bar with both flips
+    it, from long to short and from short or flat to long.
+    """
+    buy = np.asarray(buy, dtype=bool)
+    sell = np.asarray(sell, dtype=bool)
+    # +1 for a buy, -1 for a sell and 0 for neither or both
+    signal = buy.view(np.int8) - sell.view(np.int8)
+
+    # The last bar with a single signal, or -1 before the first one
+    rows = np.arange(len(signal)).reshape((-1,) + (1,) * (signal.ndim - 1))
+    last = np.where(signal != 0, rows, -1)
+    np.maximum.accumulate(last, axis=0, out=last)
+    unseen = last < 0
+    last[unseen] = 0
+    base = np.take_along_axis(signal, last, axis=0)
+    base[unseen] = position
+    both = buy & sell
+    if not both.any():
+        return base
+
+    # Bars with both signals since then, each flipping the position
+    flips = np.cumsum(both, axis=0)
+    before = np.take_along_axis(flips, last, axis=0)
+    before[unseen] = 0
+    flips -= before
+    # Flat flips to long exactly as short does
+    start = np.where(base == 0, -1, base).astype(np.int8)
+    flipped = np.where(flips % 2 == 1, -start, start)
+    return np.where(flips > 0, flipped, base).astype(np.int8)
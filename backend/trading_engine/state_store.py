@@ -0,0 +1,141 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from trading_engine.ledger import enable_wal
+
+DEFAULT_STATE_PATH = os.environ.get(
+    'STATE_DB',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'state.db')
+)
+
+# Finished backtest job records are kept this long for clients to poll
+JOB_TTL = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    special_phrase TEXT NOT NULL,
+    balance REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS strategies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    body TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs (updated);
+"""
+
+
+class StateStore:
+    """Users, saved strategies, sessions and backtest jobs in SQLite.
+
+    Every worker process reads and writes the same database rather than
+    per-process dicts. It is a separate file from the ledger's: any write
+    to the ledger's database makes each Ledger reload its positions on its
+    next read, and session and job writes are far more frequent than trades.
+    """
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ':memory:':
+            enable_wal(self._conn)
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def create_user(self, username, password, special_phrase):
+        """Add a user; returns False if the username is taken"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT OR IGNORE INTO users (username, password, special_phrase) VALUES (?, ?, ?)',
+                (username, password, special_phrase)
+            )
+        return cursor.rowcount == 1
+
+    def get_user(self, username):
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
+        return dict(row) if row else None
+
+    def add_balance(self, username, amount):
+        """Credit a user's balance and return the new balance"""
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.execute('UPDATE users SET balance = balance + ? WHERE username = ?', (amount, username))
+            row = self._conn.execute('SELECT balance FROM users WHERE username = ?', (username,)).fetchone()
+        if row is None:
+            raise KeyError(username)
+        return row[0]
+
+    def add_strategy(self, strategy):
+        """Save a strategy and return it with its assigned id"""
+        strategy = {k: v for k, v in strategy.items() if k != 'id'}
+        with self._lock:
+            cursor = self._conn.execute('INSERT INTO strategies (body) VALUES (?)', (json.dumps(strategy),))
+        return dict(strategy, id=str(cursor.lastrowid))
+
+    def list_strategies(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT id, body FROM strategies ORDER BY id').fetchall()
+        return [dict(json.loads(row['body']), id=str(row['id'])) for row in rows]
+
+    def get_strategy(self, strategy_id):
+        try:
+            strategy_id = int(strategy_id)
+        except (TypeError, ValueError):
+            return None
+        with self._lock:
+            row = self._conn.execute('SELECT id, body FROM strategies WHERE id = ?', (strategy_id,)).fetchone()
+        return dict(json.loads(row['body']), id=str(row['id'])) if row else None
+
+    def get_session(self, session_id):
+        """Return the serialized session data, or None if it is unknown or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data FROM sessions WHERE id = ? AND expires > ?', (session_id, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def save_session(self, session_id, data, expires):
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.execute('INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)', (session_id, data, expires))
+            self._conn.execute('DELETE FROM sessions WHERE expires <= ?', (time.time(),))
+
+    def delete_session(self, session_id):
+        with self._lock:
+            self._conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+
+    def save_job(self, job):
+        """Store a backtest job record so any worker can answer a poll for it"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.execute('INSERT OR REPLACE INTO jobs VALUES (?, ?, ?)', (job['id'], json.dumps(job), now))
+            self._conn.execute('DELETE FROM jobs WHERE updated < ?', (now - JOB_TTL,))
+
+    def get_job(self, job_id):
+        with self._lock:
+            row = self._conn.execute('SELECT body FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self):
+        self._conn.close()
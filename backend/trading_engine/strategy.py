@@ -1,45 +1,50 @@
 import pandas as pd
 import numpy as np
-import yfinance as yf
 from datetime import datetime, timedelta
 
+from trading_engine import indicators, metrics
+from trading_engine.data_store import get_bar_store
+from trading_engine.instrumentation import stage
+from trading_engine.signals import rsi_ma_signals, signal_to_trades
+
 class TradingStrategy:
-    def __init__(self, symbol, start_date, end_date):
+    def __init__(self, symbol, start_date, end_date, store=None, result_cache=None):
         self.symbol = symbol
         self.start_date = start_date
         self.end_date = end_date
+        self.store = store
+        self.result_cache = result_cache
         self.data = None
         self.positions = []
         self.trades = []
         
     def fetch_data(self):
         """Fetch historical data for the symbol"""
-        stock = yf.Ticker(self.symbol)
-        self.data = stock.history(start=self.start_date, end=self.end_date)
+        store = self.store or get_bar_store()
+        with stage('backtest.load_data'):
+            self.data = store.history(self.symbol, self.start_date, self.end_date)
         return self.data
     
     def calculate_moving_average(self, window=20):
         """Calculate simple moving average"""
         if self.data is None:
             self.fetch_data()
-        self.data['MA'] = self.data['Close'].rolling(window=window).mean()
+        self.data['MA'] = indicators.sma(self.data['Close'], window)
         return self.data['MA']
     
     def calculate_rsi(self, window=14):
         """Calculate Relative Strength Index"""
         if self.data is None:
             self.fetch_data()
-            
-        delta = self.data['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        
-        rs = gain / loss
-        self.data['RSI'] = 100 - (100 / (1 + rs))
+        self.data['RSI'] = indicators.rsi(self.data['Close'], window)
         return self.data['RSI']
     
-    def backtest(self, strategy_params):
-        """Backtest a trading strategy"""
+    def backtest(self, strategy_params, vectorized=True, execution=None):
+        """Backtest a trading strategy
+        
+        execution is an optional ExecutionSimulator that fills the signals
+        with orders, costs and sizing instead of at each bar's close.
+        """
         if self.data is None:
             self.fetch_data()
             
@@ -48,11 +53,160 @@ class TradingStrategy:
         rsi_window = strategy_params.get('rsi_window', 14)
         rsi_overbought = strategy_params.get('rsi_overbought', 70)
         rsi_oversold = strategy_params.get('rsi_oversold', 30)
+        spec = {
+            'ma_window': ma_window,
+            'rsi_window': rsi_window,
+            'rsi_overbought': rsi_overbought,
+            'rsi_oversold': rsi_oversold
+        }
+        if execution is not None:
+            spec['execution'] = execution.spec()
+        
+        def run():
+            # Calculate indicators
+            with stage('backtest.indicators'):
+                self.calculate_moving_average(ma_window)
+                self.calculate_rsi(rsi_window)
+            
+            with stage('backtest.signals'):
+                if vectorized:
+                    self.trades = self._generate_trades(rsi_overbought, rsi_oversold)
+                else:
+                    self.trades = self._generate_trades_loop(rsi_overbought, rsi_oversold)
+            with stage('backtest.performance'):
+                return self.calculate_performance(execution=execution)
+        
+        return self._cached(spec, run)
+    
+    def backtest_plan(self, plan, execution=None):
+        """Backtest a compiled Strategy Builder plan"""
+        if self.data is None:
+            self.fetch_data()
         
-        # Calculate indicators
-        self.calculate_moving_average(ma_window)
-        self.calculate_rsi(rsi_window)
+        def run():
+            with stage('backtest.signals'):
+                buy, sell = plan.evaluate(self.data)
+                self.trades = self._trades_from_signals(buy, sell)
+            with stage('backtest.performance'):
+                return self.calculate_performance(execution=execution)
         
+        spec = {'plan': repr((plan.nodes, plan.buy, plan.sell))}
+        if execution is not None:
+            spec['execution'] = execution.spec()
+        return self._cached(spec, run)
+
+    def backtest_chunked(self, strategy_params, chunk_size=100000, periods_per_year=252, interval='1d'):
+        """Backtest chunk by chunk without loading the whole history.
+
+        Bars of the given interval are streamed from the memory-mapped bar
+        store. The last few closes of each chunk are carried into the next
+        one so the indicators warm up exactly as they would on the full
+        series, and the position and performance state are carried the same
+        way, so the trades match backtest(). self.data is left untouched.
+        """
+        ma_window = strategy_params.get('ma_window', 20)
+        rsi_window = strategy_params.get('rsi_window', 14)
+        rsi_overbought = strategy_params.get('rsi_overbought', 70)
+        rsi_oversold = strategy_params.get('rsi_oversold', 30)
+        warmup = max(ma_window, rsi_window + 1)
+
+        store = self.store or get_bar_store()
+        accumulator = metrics.MetricsAccumulator(periods_per_year)
+        tail = pd.Series(dtype=np.float64)
+        position = 0
+        trades = []
+
+        for chunk in store.iter_chunks(self.symbol, self.start_date, self.end_date, chunk_size=chunk_size,
+                                       interval=interval):
+            close = pd.concat([tail, chunk['Close']]) if len(tail) else chunk['Close']
+            ma = indicators.sma(close, ma_window).to_numpy()
+            rsi = indicators.rsi(close, rsi_window).to_numpy()
+            buy, sell = rsi_ma_signals(close.to_numpy(), ma, rsi, rsi_oversold, rsi_overbought)
+
+            # Drop the carried warm-up bars; rsi_ma_signals only masks row 0,
+            # which is the first bar of the history only on the first chunk
+            skip = len(tail)
+            idx, values = signal_to_trades(buy[skip:], sell[skip:], position)
+
+            prices = chunk['Close'].to_numpy()
+            trades.extend(
+                {
+                    'date': chunk.index[i],
+                    'type': 'buy' if value > 0 else 'sell',
+                    'price': prices[i],
+                    'position': int(value)
+                }
+                for i, value in zip(idx, values)
+            )
+
+            # Position held after each bar of the chunk
+            n = len(chunk)
+            signal = np.zeros(n, dtype=np.int8)
+            has_trade = np.zeros(n, dtype=bool)
+            signal[idx] = values
+            has_trade[idx] = True
+            last = np.maximum.accumulate(np.where(has_trade, np.arange(n), -1))
+            held = np.where(last >= 0, signal[last], position).astype(np.int8)
+
+            accumulator.update(prices, held, chunk.index)
+            if len(values):
+                position = int(values[-1])
+            tail = close.iloc[-warmup:]
+
+        self.trades = trades
+        if not trades:
+            return metrics.empty_metrics()
+        result = accumulator.result()
+        result['trades'] = trades
+        return result
+
+    def _cached(self, spec, run):
+        """Serve a backtest result from the result cache, or run and store it"""
+        if self.result_cache is None:
+            return run()
+        
+        with stage('backtest.cache_lookup'):
+            key = self.result_cache.make_key(self.symbol, self.start_date, self.end_date, spec, self.data)
+            result = self.result_cache.get(key)
+        if result is not None:
+            # Cached results are stored as JSON: restore the trade dates
+            result['trades'] = [dict(t, date=pd.Timestamp(t['date'])) for t in result.get('trades', [])]
+            self.trades = result['trades']
+            return result
+        
+        result = run()
+        self.result_cache.put(key, result)
+        return result
+    
+    def _generate_trades(self, rsi_overbought, rsi_oversold):
+        """Generate trades from the indicator columns with array operations"""
+        buy, sell = rsi_ma_signals(
+            self.data['Close'].to_numpy(),
+            self.data['MA'].to_numpy(),
+            self.data['RSI'].to_numpy(),
+            rsi_oversold,
+            rsi_overbought
+        )
+        return self._trades_from_signals(buy, sell)
+    
+    def _trades_from_signals(self, buy, sell):
+        """Turn buy/sell masks into the trades list"""
+        close = self.data['Close'].to_numpy()
+        idx, positions = signal_to_trades(buy, sell)
+        
+        dates = self.data.index
+        return [
+            {
+                'date': dates[i],
+                'type': 'buy' if position > 0 else 'sell',
+                'price': close[i],
+                'position': int(position)
+            }
+            for i, position in zip(idx, positions)
+        ]
+    
+    def _generate_trades_loop(self, rsi_overbought, rsi_oversold):
+        """Reference bar-by-bar implementation of the trade generation"""
         # Initialize position tracking
         position = 0
         trades = []
@@ -83,40 +237,36 @@ class TradingStrategy:
                     'position': position
                 })
         
-        self.trades = trades
-        return self.calculate_performance()
+        return trades
     
-    def calculate_performance(self):
-        """Calculate strategy performance metrics"""
+    def position_series(self):
+        """Position held after each bar, rebuilt from the trades list"""
+        n = len(self.data)
+        signal = np.zeros(n, dtype=np.int8)
+        has_trade = np.zeros(n, dtype=bool)
+        if self.trades:
+            bars = self.data.index.get_indexer([t['date'] for t in self.trades])
+            signal[bars] = [t['position'] for t in self.trades]
+            has_trade[bars] = True
+        last = np.maximum.accumulate(np.where(has_trade, np.arange(n), -1)) if n else has_trade
+        return np.where(last >= 0, signal[last], 0).astype(np.int8)
+    
+    def calculate_performance(self, periods_per_year=252, execution=None):
+        """Calculate strategy performance metrics from the mark-to-market equity curve"""
         if not self.trades:
-            return {
-                'total_return': 0,
-                'sharpe_ratio': 0,
-                'max_drawdown': 0,
-                'win_rate': 0
-            }
-        
-        # Calculate returns
-        returns = []
-        for i in range(1, len(self.trades)):
-            if self.trades[i]['type'] == 'sell':
-                returns.append(
-                    (self.trades[i]['price'] - self.trades[i-1]['price']) / 
-                    self.trades[i-1]['price']
-                )
-        
-        returns = pd.Series(returns)
+            return metrics.empty_metrics()
         
-        # Calculate metrics
-        total_return = (1 + returns).prod() - 1
-        sharpe_ratio = returns.mean() / returns.std() if len(returns) > 1 else 0
-        max_drawdown = (returns.cumsum().expanding().max() - returns.cumsum()).max()
-        win_rate = (returns > 0).mean()
+        self.positions = self.position_series()
+        if execution is not None:
+            result = execution.run(self.data, self.trades, periods_per_year=periods_per_year)
+            result['trades'] = self.trades
+            return result
         
-        return {
-            'total_return': total_return,
-            'sharpe_ratio': sharpe_ratio,
-            'max_drawdown': max_drawdown,
-            'win_rate': win_rate,
-            'trades': self.trades
-        } 
\ No newline at end of file
+        result = metrics.performance_metrics(
+            self.data['Close'].to_numpy(),
+            self.positions,
+            index=self.data.index,
+            periods_per_year=periods_per_year
+        )
+        result['trades'] = self.trades
+        return result
@@ -0,0 +1,9 @@
+"""WSGI entry point, e.g. `gunicorn -w 4 wsgi:app`
+
+Each worker imports this module after the fork and gets its own ledger
+connection, backtest pool and price stream. Set WARM_UP=1 to import the
+data stack at worker start instead of on the first data request.
+"""
+from app import create_app
+
+app = create_app()
@@ -55,8 +55,10 @@ const StrategyBuilder: React.FC = () => {
     { id: 'sma', type: 'indicator', name: 'Simple Moving Average', params: { period: 20 } },
     { id: 'ema', type: 'indicator', name: 'Exponential Moving Average', params: { period: 20 } },
     { id: 'rsi', type: 'indicator', name: 'Relative Strength Index', params: { period: 14 } },
-    { id: 'price_above', type: 'condition', name: 'Price Above', params: { value: 0 } },
-    { id: 'price_below', type: 'condition', name: 'Price Below', params: { value: 0 } },
+    { id: 'price_above', type: 'condition', name: 'Price Above', params: { value: 0, indicator: '' } },
+    { id: 'price_below', type: 'condition', name: 'Price Below', params: { value: 0, indicator: '' } },
+    { id: 'indicator_above', type: 'condition', name: 'Indicator Above', params: { indicator1: '', value: 0 } },
+    { id: 'indicator_below', type: 'condition', name: 'Indicator Below', params: { indicator1: '', value: 0 } },
     { id: 'cross_above', type: 'condition', name: 'Cross Above', params: { indicator1: '', indicator2: '' } },
     { id: 'cross_below', type: 'condition', name: 'Cross Below', params: { indicator1: '', indicator2: '' } },
     { id: 'buy', type: 'action', name: 'Buy', params: { quantity: 1 } },
@@ -139,7 +141,10 @@ const StrategyBuilder: React.FC = () => {
             errors.push({ blockId: block.id, message: `${block.name} requires two indicators to be selected` });
           }
         } else {
-          if (block.params.value === undefined || block.params.value === '') {
+          if (block.name.includes('Indicator') && !block.params.indicator1) {
+            errors.push({ blockId: block.id, message: `${block.name} requires an indicator to be selected` });
+          }
+          if (!block.params.indicator && (block.params.value === undefined || block.params.value === '')) {
             errors.push({ blockId: block.id, message: `${block.name} requires a value to be set` });
           }
         }